@@ -0,0 +1,67 @@
+""" Concurrency backends under load, thousands of callers sharing one
+	client against the stand-in server of the tests.
+
+		python benchmarks/concurrency.py [calls per caller]
+
+	threads  - native threads, the default backend
+	gevent   - greenlets with concurrency='gevent', no monkey-patching
+	patched  - greenlets in a monkey-patched process, concurrency='auto'
+
+	The hub stall is the worst delay of a greenlet sleeping 5 ms in a loop
+	next to the callers, a blocking primitive would stall every greenlet.
+"""
+import os
+import sys
+import time
+import subprocess
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+def worker(mode:str, callers:int, calls:int, port:int):
+	if mode == 'patched':
+		from gevent import monkey
+		monkey.patch_all()
+	sys.path.insert(0, os.path.join(root, 'src'))
+	import logging
+	logging.basicConfig(level=logging.CRITICAL)
+	from relock import TCP
+	from relock.thread.backend import backend
+
+	tcp = TCP('127.0.0.1', port, pool=16, health=0, acquire=60, deadline=60,
+			  concurrency={'patched': 'auto'}.get(mode, mode))
+	done, stall, running = [0], [0.0], [True]
+	def call(key):
+		for _ in range(calls):
+			with tcp('echo', key=key) as result:
+				done[0] += result.ok
+	def heartbeat():
+		while running[0]:
+			started = time.perf_counter()
+			backend.sleep(0.005)
+			stall[0] = max(stall[0], time.perf_counter() - started - 0.005)
+	beat = backend.spawn(heartbeat)
+	started = time.perf_counter()
+	for _ in [backend.spawn(call, (key,)) for key in range(callers)]:
+		_.join()
+	elapsed, running[0] = time.perf_counter() - started, False
+	beat.join()
+	print('%-8s %5d callers %7d calls %7d ok %6.2fs %8.0f calls/s   hub stall %s' % (mode,
+		  callers, callers * calls, done[0], elapsed, callers * calls / elapsed,
+		  '%.1f ms' % (stall[0] * 1000) if backend.name == 'gevent' else '-'))
+
+if __name__ == '__main__':
+	if len(sys.argv) > 1 and sys.argv[1] == 'worker':
+		worker(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), int(sys.argv[5]))
+		sys.exit()
+	calls = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+	server = subprocess.Popen([sys.executable, os.path.join(root, 'tests', 'server.py'), 'plain'],
+							  stdout=subprocess.PIPE, text=True)
+	try:
+		port = server.stdout.readline().strip()
+		for mode, callers in (('threads', 100), ('threads', 1000),
+							  ('gevent', 100), ('gevent', 1000), ('gevent', 5000),
+							  ('patched', 100), ('patched', 1000), ('patched', 5000)):
+			subprocess.run([sys.executable, __file__, 'worker', mode, str(callers), str(calls), port],
+						   timeout=600)
+	finally:
+		server.kill()
@@ -0,0 +1,71 @@
+""" Framing microbenchmark, the receive loop and the concatenating send of
+	the earlier releases against the preallocated `recv_into` buffers and
+	the `sendmsg` scatter/gather writes of `relock.tcp.socket.Socket`.
+
+		python benchmarks/framing.py
+"""
+import os
+import sys
+import time
+import socket
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'src'))
+
+from relock.tcp.socket import Socket
+
+def loop_sendall(sock:socket.socket, _:bytes):
+	#: Earlier release, header and body concatenated for every frame.
+	sock.sendall(len(_).to_bytes(3, byteorder='big') + _)
+
+def loop_recvall(sock:socket.socket, _:bytes = bytes()) -> bytes:
+	#: Earlier release, 2048 byte slices appended to an immutable buffer.
+	if abs := sock.recv(3):
+		if abs := int.from_bytes(abs, byteorder='big'):
+			while slice := sock.recv(2048):
+				_ += slice
+				if len(_) >= abs:
+					break
+	return _
+
+def connection(sock:socket.socket) -> Socket:
+	""" Socket of the client around one end of the pair, without the
+		connect and the hello.
+	"""
+	conn = Socket.__new__(Socket)
+	conn.request, conn.addr, conn.used = sock, ('pair', 0), 0
+	conn.reading = conn.writing = threading.RLock()
+	conn.compression, conn.threshold, conn.connected = None, 0, True
+	return conn
+
+def measure(size:int, frames:int, framing) -> float:
+	""" Seconds per frame, one frame in flight at a time. The framing
+		gives the (send, recv) pair for the two ends of the connection.
+	"""
+	left, right = socket.socketpair()
+	send, recv = framing(left, right)
+	body, turn = os.urandom(size), threading.Semaphore(1)
+	def writer():
+		for _ in range(frames):
+			turn.acquire()
+			send(body)
+	thread = threading.Thread(target=writer)
+	started = time.perf_counter()
+	thread.start()
+	for _ in range(frames):
+		assert len(recv()) == size
+		turn.release()
+	thread.join()
+	elapsed = time.perf_counter() - started
+	left.close()
+	right.close()
+	return elapsed / frames
+
+if __name__ == '__main__':
+	print('%10s %14s %14s %8s' % ('frame', 'loop', 'buffers', 'speedup'))
+	for size, frames in ((1 << 10, 5000), (64 << 10, 1000), (1 << 20, 100), (8 << 20, 10)):
+		before = measure(size, frames, lambda left, right: (lambda _: loop_sendall(left, _),
+																	lambda: loop_recvall(right)))
+		after  = measure(size, frames, lambda left, right: (connection(left).sendall,
+															connection(right).recvall))
+		print('%8sKB %11.1f us %11.1f us %7.1fx' % (size >> 10, before * 1e6, after * 1e6, before / after))
@@ -4,6 +4,7 @@ __credits__ = 'relock Inc.'
 from .tcp import TCP
 from .tcp.socket import Socket
 from .thread import Thread
+from .aio import AsyncTCP, AsyncDevice
 try:
 	from flask import session
 except Exception as e:
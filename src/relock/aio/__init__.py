@@ -0,0 +1,349 @@
+import time
+import random
+import asyncio
+import logging
+
+logging = logging.getLogger('sentinel.aio.client')
+
+from typing import Any
+from uuid import uuid4
+
+from ..tcp import TCP
+from ..tcp.pool import Exhausted
+from ..tcp.result import Result
+from ..tcp.retry import Budget, IDEMPOTENT, NEVER, budget as shared
+from ..tcp.hedge import Hedge
+from ..tcp.socket import address
+from ..tcp.cluster import candidates
+from .cluster import Cluster
+from .core import Core
+from .device import AsyncDevice
+
+class AsyncTCP(Core):
+	""" Native asyncio client for ASGI applications. It speaks the same 
+		framing as the blocking `relock.tcp.TCP` client, but never blocks
+		the event loop.
+
+			async with AsyncTCP(host='127.0.0.1', port=8111) as tcp:
+				result = await tcp('before', **kwargs)
+	"""
+
+	def __init__(self, host:list  = list(), 
+					   port:int   = 8111,
+					   pool:int   = 1,
+					   timeout:int = 300,
+					   schema:str = 'tcp',
+					   acquire:float = 5.0,
+					   idle:float = 30.0,
+					   codecs:list = None,
+					   compress:int = 1024,
+					   affinity:bool = False,
+					   balancer:object = 'round',
+					   health:float = 5.0,
+					   deadline:float = 5.0,
+					   deadlines:dict = None,
+					   connect:float = 1.0,
+					   budget:float = None,
+					   idempotent:set = None,
+					   hedge:set = None,
+					   percentile:float = 95.0,
+					   hedging:float = 0.05):
+		self.id       = str(uuid4())
+		self.pool     = pool
+		self.timeout  = timeout
+		self.acquire  = acquire
+		self.idle     = idle
+		self.codecs   = codecs
+		self.compress = compress
+		self.affinity = affinity
+		self.balancer = balancer
+		self.health   = health
+		self.checker  = None
+		self.refreshing = False
+		#: Deadlines, retry budget and idempotent routes, see `TCP`.
+		self.deadline  = float(deadline) if deadline else None
+		self.deadlines = dict(deadlines or {})
+		self.connect_timeout = float(connect) if connect else None
+		self.budget   = Budget(budget) if budget is not None else shared
+		self.idempotent = frozenset(IDEMPOTENT if idempotent is None else idempotent) - NEVER
+		#: Hedged routes, see `TCP`. The losing legs are drained in the
+		#: background and kept here until they finish.
+		self.hedge    = Hedge(hedge, percentile, hedging)
+		self.legs     = set()
+		self.servers  = Cluster(pool, acquire, idle, codecs, compress, affinity, balancer, self.connect_timeout)
+		self.refresh  = None
+		#: Seconds it took to connect and fill the pools.
+		self.warmup   = None
+		self._exposed = set()
+		self.schema   = schema
+		if not isinstance(host, list):
+			host = [(host, port),]
+		self.host     = [address(*_, schema=schema) for _ in host]
+
+	#: The call policy is shared with the blocking client.
+	expires 	  = TCP.expires
+	wait 		  = TCP.wait
+	retriable 	  = TCP.retriable
+
+	async def __aenter__(self):
+		return await self.connect()
+
+	async def __aexit__(self, *args):
+		await self.close()
+
+	async def __call__(self, route:str, **kwargs) -> Result:
+		""" Send the request to one of the cluster servers and return its
+			`Result`, as the blocking client does. If the server has gone
+			the next one is tried, every server in the cluster at most once.
+		"""
+		if not self.servers:
+			await self.connect()
+		started, status, response, addr = time.perf_counter(), 'down', None, None
+		deadline = self.expires(route)
+		#: The call sticks to the cluster snapshot it has started with.
+		servers, sent = self.servers, False
+		self.budget.deposit()
+		if route in self.hedge and len(servers) > 1:
+			if (result := await self.hedged(servers, route, deadline, **kwargs)) is not None:
+				return Result(route, result[0], 'ok', time.perf_counter() - started, result[1])
+		for attempt in range(len(servers) + 1):
+			if deadline is not None and deadline <= time.monotonic():
+				status = 'timeout'
+				break
+			if sent and not self.retriable(route):
+				break
+			if (server := servers.route(kwargs.get('sid'))) is None:
+				break
+			addr, sent = (server.host, server.port), False
+			try:
+				with server:
+					async with server.pool.connection(self.wait(deadline)) as conn:
+						rtt, sent = time.perf_counter(), True
+						response = await conn.within(deadline, **{'route': route, **kwargs})
+						server.observe(time.perf_counter() - rtt)
+			except Exhausted as e:
+				logging.warning('Relock pool is busy, %s', e)
+				status = 'busy'
+			except TimeoutError as e:
+				logging.warning('Relock call %s to %s:%s has timed out, %s', route, server.host, server.port, e)
+				server.failure()
+				status = 'timeout'
+				continue
+			except OSError:
+				logging.debug('Route to relock no longer exists, host %s:%s have gone down.', server.host, server.port)
+				server.failure()
+				status = 'down'
+				continue
+			except Exception as e:
+				logging.error('No route to the TCP server host %s could be found.', e)
+				status = 'error'
+			else:
+				server.success()
+				status = 'ok'
+			break
+		return Result(route, response, status, time.perf_counter() - started, addr)
+
+	async def send(self, server:object, route:str, deadline:float = None, **kwargs) -> Any:
+		""" A single round trip to the server, one leg of a hedged call.
+		"""
+		with server:
+			async with server.pool.connection(self.wait(deadline)) as conn:
+				rtt = time.perf_counter()
+				response = await conn.within(deadline, **{'route': route, **kwargs})
+				server.observe(time.perf_counter() - rtt)
+		server.success()
+		return response
+
+	async def hedged(self, servers:Cluster, route:str, deadline:float = None, **kwargs) -> tuple:
+		""" Send the request and, if the reply is late, a duplicate to
+			another server, the first reply wins, see `TCP.hedged`. The 
+			loser isn't cancelled half way through the round trip, it's 
+			drained so its connection stays usable.
+		"""
+		if (server := servers.route(kwargs.get('sid'))) is None:
+			return None
+		self.hedge.budget.deposit()
+		started = time.perf_counter()
+		def settle(leg, first=False):
+			self.legs.discard(leg)
+			if not leg.cancelled() and leg.exception() is None and first:
+				self.hedge.record(route, time.perf_counter() - started)
+		def submit(server, first=False):
+			self.legs.add(leg := asyncio.ensure_future(self.send(server, route, deadline, **kwargs)))
+			leg.add_done_callback(lambda leg: settle(leg, first))
+			legs[leg] = server
+		remaining = lambda: max(deadline - time.monotonic(), 0) if deadline is not None else None
+		legs = dict()
+		submit(server, True)
+		if (threshold := self.hedge.threshold(route)) is not None:
+			if remaining() is not None:
+				threshold = min(threshold, remaining())
+			if not (await asyncio.wait(legs, timeout=threshold))[0] and self.hedge.budget.withdraw():
+				if (spare := servers.spare(server)) is not None:
+					logging.debug('Relock call %s to %s:%s is late, hedged to %s:%s', route, server.host,
+																						   server.port,
+																						   spare.host,
+																						   spare.port)
+					submit(spare)
+		pending = set(legs)
+		while pending:
+			done, pending = await asyncio.wait(pending, timeout=remaining(), 
+														return_when=asyncio.FIRST_COMPLETED)
+			if not done:
+				break
+			for leg in done:
+				if (e := leg.exception()) is None:
+					return leg.result(), (legs[leg].host, legs[leg].port)
+				logging.debug('Hedged call %s to %s:%s failed, %s', route, legs[leg].host,
+																		 legs[leg].port, e)
+				if isinstance(e, OSError):
+					legs[leg].failure()
+
+	async def stream(self, route:str, **kwargs):
+		""" Iterate over the response of a list-style route chunk by chunk,
+			see `TCP.stream`.
+
+				async for id, device in tcp.stream('devices', user=user):
+					...
+		"""
+		if not self.servers:
+			await self.connect()
+		if (server := self.servers.route(kwargs.get('sid'))) is None:
+			logging.warning('No relock server for the stream of %s', route)
+			raise ConnectionRefusedError('No relock server is routable.')
+		try:
+			async with server.pool.connection() as conn:
+				async for item in conn.stream(**{'route': route, **kwargs}):
+					yield item
+		except Exhausted as e:
+			logging.warning('Relock pool is busy, %s', e)
+			raise
+		except OSError:
+			logging.debug('Route to relock no longer exists, host %s:%s have gone down.', server.host, server.port)
+			server.failure()
+			raise
+
+	async def batch(self, calls:list) -> list:
+		""" Send several route payloads in a single frame and return the
+			list of responses in the same order, see `TCP.batch`.
+		"""
+		calls = [dict(call) for call in calls]
+		if isinstance(response := (result := await self('batch', batch=calls)).response, list) and \
+		   len(response) == len(calls):
+			return response
+		if not result.ok:
+			#: No reply, the batch may have run already and is not replayed.
+			logging.warning('Batch of %s calls has failed, %s', len(calls), result.status)
+			return [None] * len(calls)
+		logging.debug('Batch route is not supported by the relock service.')
+		responses = list()
+		for call in calls:
+			try:
+				responses.append((await self(**call)).response)
+			except Exception as e:
+				logging.error('Batched call %s failed, %s', call.get('route'), e)
+				responses.append(None)
+		return responses
+
+	async def connect(self):
+		if not self.servers:
+			#: Seed the cluster from the configured hosts, then ask them 
+			#: for the members.
+			started = time.perf_counter()
+			if await self.round():
+				await self.round()
+			self.warmup = time.perf_counter() - started
+			logging.info('Relock warm-up took %.3fs, %s servers, %s connections', self.warmup,
+																				 len(self.servers),
+																				 sum(len(_.pool) for _ in self.servers))
+		if self.timeout and self.refresh is None:
+			self.refresh = asyncio.create_task(self.refresh_sentinel_tenants(self.timeout))
+		if self.health and self.checker is None:
+			self.checker = asyncio.create_task(self.healthcheck(self.health))
+		return self
+
+	async def close(self):
+		if self.refresh is not None:
+			self.refresh.cancel()
+			self.refresh = None
+		if self.checker is not None:
+			self.checker.cancel()
+			self.checker = None
+		for server in list(self.servers):
+			server.pool.close()
+		self.servers = self.servers.fork()
+
+	async def round(self, server:object = None):
+		""" Refresh the topology with a new cluster snapshot swapped in at
+			once, see `TCP.__round__`.
+		"""
+		if self.refreshing:
+			return len(self.servers)
+		self.refreshing = True
+		try:
+			current, members = self.servers, list()
+			if current and (result := await self('members')).ok and isinstance(result.response, dict):
+				members = list(result.response.values())
+			if not members:
+				members = [{'addr': host, 'port': port} for host, port in self.host] + \
+						  [{'addr': _.host, 'port': _.port} for _ in current]
+			snapshot, members = current.fork(), candidates(members, self.host)
+			#: New servers are connected all at once rather than one by one.
+			fresh = [addr for addr in members if (_ := current.find(addr)) is None or _ is server]
+			opened = dict(zip(fresh, await asyncio.gather(*[snapshot.open(*addr) for addr in fresh],
+														   return_exceptions=True)))
+			for addr, sentinel in members.items():
+				if addr not in opened:
+					snapshot.adopt(current.find(addr))
+				elif isinstance(_ := opened[addr], BaseException) or _ is None:
+					logging.info('Server %s:%s is unreachable, %s', *addr, _)
+					continue
+				else:
+					snapshot.adopt(_)
+					logging.info('New server %s:%s in pool', *addr)
+				if 'weight' in sentinel:
+					snapshot.weigh(addr, sentinel.get('weight'))
+			if snapshot or not current:
+				self.servers = snapshot
+				for _ in current:
+					if not (_.host, _.port) in snapshot:
+						logging.info('Serever %s:%s has left the cluster', _.host, _.port)
+						_.pool.retire()
+		finally:
+			self.refreshing = False
+		logging.debug('Rounding routes, available: %s', len(self.servers))
+		return len(self.servers)
+
+	async def check(self, server:object) -> bool:
+		""" Probe the server off the request path, see `TCP.check`.
+		"""
+		if server.state == 'ejected' and not server.due:
+			return False
+		try:
+			await server.pool.fill()
+		except Exception as e:
+			logging.debug('Health check of %s:%s failed, %s', server.host, server.port, e)
+			if server.state == 'ejected':
+				server.eject()
+			else:
+				server.failure()
+			return False
+		else:
+			server.recover()
+		return True
+
+	async def healthcheck(self, interval):
+		while True:
+			await asyncio.sleep(interval)
+			for server in list(self.servers):
+				await self.check(server)
+
+	async def refresh_sentinel_tenants(self, timeout):
+		while True:
+			#: The jitter keeps the workers of a deployment from refreshing
+			#: in lockstep.
+			await asyncio.sleep(timeout * random.uniform(0.8, 1.2))
+			try:
+				await self.round()
+			except Exception as e:
+				logging.error('Refresh of the relock servers failed, %s', e)
@@ -0,0 +1,145 @@
+import logging
+
+from dataclasses import dataclass
+
+from ..tcp.cluster import Ring
+from ..tcp.balancer import Load, Balancer, balancers
+from ..tcp.health import Breaker
+from .pool import Pool
+
+@dataclass
+class Server(Load, Breaker):
+	
+	host: str        = str()
+	port: int 	     = 0
+	pool: object     = None
+
+	def __bool__(self):
+		return self.pool is not None
+
+class Cluster(list):
+	""" Asyncio counterpart of `relock.tcp.cluster.Cluster`, the servers
+		are picked round-robin or by the session key on the hash ring.
+	"""
+
+	pool: int 		= 1
+	acquire: float 	= 5.0
+	idle: float 	= 30.0
+	codecs: list 	= None
+	compress: int 	= 0
+	affinity: bool 	= False
+	balancer: object = None
+	connect: float 	= None
+
+	__id__: int = 0
+
+	def __init__(self, pool:int = 1, 
+					   acquire:float = 5.0,
+					   idle:float = 30.0,
+					   codecs:list = None,
+					   compress:int = 0,
+					   affinity:bool = False,
+					   balancer:object = 'round',
+					   connect:float = None):
+		self.pool    = int(pool)
+		self.acquire = float(acquire)
+		self.idle    = float(idle)
+		self.codecs  = codecs
+		self.compress = int(compress or 0)
+		self.affinity = bool(affinity)
+		self.ring     = Ring()
+		self.balancer = balancers[balancer]() if isinstance(balancer, str) else balancer or Balancer()
+		self.connect  = connect
+
+	async def __call__(self, host:str, port:int):
+		if not (host, port) in self:
+			if (_ := await self.open(host, port)) is not None:
+				return self.adopt(_)
+
+	async def open(self, host:str, port:int) -> Server:
+		""" Connect a new server without adding it to the cluster, see
+			`relock.tcp.cluster.Cluster.open`.
+		"""
+		if _ := Server(host,
+					   port,
+					   Pool(host, 
+							port, 
+							self.pool,
+							acquire=self.acquire,
+							idle=self.idle,
+							codecs=self.codecs,
+							compress=self.compress,
+							connect=self.connect)):
+			if await _.pool.fill():
+				return _
+
+	def fork(self):
+		""" Empty cluster with the same settings and balancer, see 
+			`relock.tcp.cluster.Cluster.fork`.
+		"""
+		return Cluster(self.pool,
+					   self.acquire,
+					   self.idle,
+					   self.codecs,
+					   self.compress,
+					   self.affinity,
+					   self.balancer,
+					   self.connect)
+
+	def adopt(self, server:Server) -> Server:
+		if not (server.host, server.port) in self:
+			self.append(server)
+			self.ring.add((server.host, server.port))
+		return server
+
+	def find(self, addr:tuple) -> Server:
+		for server in self:
+			if server.host == addr[0] and server.port == addr[1]:
+				return server
+
+	def __contains__(self, addr:tuple):
+		if isinstance(addr, tuple):
+			for server in self:
+				if server.host == addr[0] and server.port == addr[1]:
+					return True
+		else:
+			for server in self:
+				if server == addr:
+					return True
+		return False
+
+	def __next__(self):
+		if self.__id__ >= len(self):
+			self.__id__ = 0
+		self.__id__ += 1
+		if _ := len(self):
+			return self[self.__id__ - 1]
+
+	def route(self, key:str = None) -> Server:
+		#: Ejected servers are out of the rotation, unless all of them 
+		#: are, then it's better to try than to fail right away.
+		servers = [server for server in self if server.routable] or list(self)
+		if self.affinity and key:
+			if (addr := self.ring.lookup(key)) is not None:
+				for server in servers:
+					if server.host == addr[0] and server.port == addr[1]:
+						return server
+		return self.balancer(servers)
+
+	def spare(self, server:Server) -> Server:
+		return self.balancer([_ for _ in self if _ is not server and _.routable])
+
+	def weigh(self, addr:tuple, weight:float):
+		for server in self:
+			if server.host == addr[0] and server.port == addr[1]:
+				server.weight = max(float(weight), 0.001)
+
+	def __bool__(self):
+		return True if len(self) else False
+
+	def remove(self, item):
+		for server in list(self):
+			if server.host == item.host and server.port == item.port:
+				super().remove(server)
+				server.pool.close()
+		self.ring.discard((item.host, item.port))
@@ -0,0 +1,51 @@
+import logging
+
+from typing import Any
+
+from .events import Events
+
+class Core(Events):
+
+	async def get(self, key:str):
+		return (await self('get', key=key)).response
+
+	async def set(self, key:str, value:Any):
+		return (await self('set', key=key, value=value)).response
+
+	async def delete(self, key:str):
+		return (await self('delete', key=key)).response
+
+	async def exists(self, key:str):
+		return (await self('exists', key=key)).response
+
+	async def keys(self, key:str):
+		return (await self('keys', key=key)).response
+
+	async def ttl(self, key:str, value:int):
+		return (await self('ttl', key=key, value=value)).response
+
+	async def expire(self, key:str, value:int):
+		return (await self('expire', key=key, value=value)).response
+
+	async def zadd(self, key:str, score:int, **kwargs):
+		return (await self('zadd', key=key,
+								   score=score,
+								   value=kwargs)).response
+
+	async def zrange(self, key:str, x:int=0, y:int=-1):
+		return (await self('zrange', key=key, x=x, y=y)).response
+
+	async def zrevrange(self, key:str, x:int=0, y:int=-1):
+		return (await self('zrevrange', key=key, x=x, y=y)).response
+
+	async def zrem(self, key:str, value:Any):
+		return (await self('zrem', key=key, value=value)).response
+
+	async def sadd(self, key:str, **kwargs):
+		return (await self('sadd', key=key, **kwargs)).response
+
+	async def srem(self, key:str, **kwargs):
+		return (await self('srem', key=key, **kwargs)).response
+
+	async def smembers(self, key:str, **kwargs):
+		return (await self('smembers', key=key)).response
@@ -0,0 +1,214 @@
+import binascii
+import logging
+
+from typing import Any, Union
+
+from ..tcp.codec import unhexlify
+
+class AsyncDevice(object):
+
+	def __init__(self, tcp:object,
+					   sid:str = str(),
+					   rid:str = str(),
+					   host:str = None):
+		""" Asyncio counterpart of the Flask `Device` object. It's not bound
+			to any web framework, the ASGI application creates it for each
+			request with the relock session id and request id, and it lives
+			as long as the request is being processed.
+
+			:param tcp: Connected `AsyncTCP` client
+			:type tcp: AsyncTCP
+			:param sid: The relock session id (x-session-id)
+			:type sid: string
+			:param rid: The relock request id
+			:type rid: string
+
+			Returns:
+				None
+		"""
+		self.tcp         = tcp
+		self.sid         = sid
+		self.rid         = rid
+		self.host        = host
+		self.screen      = str()
+		self.owner       = None
+		self.__nonce     = bytes()
+		self.__signature = bytes()
+
+	async def __call__(self, route:str = str(), **kwargs) -> Any:
+		""" Router to the relock service, returns the service-side 
+			generated response for a call.
+		"""
+		return (await self.tcp(**{'route': route,
+								  'sid': self.sid,
+								  'rid': self.rid,
+								  'host': self.host,
+								  **kwargs})).response
+
+	async def before(self, **kwargs) -> Any:
+		""" Register the incoming request in the relock service. The 
+			arguments are the same as sent by the Flask `Device` (cookies, 
+			host, agent, addr, method, url, path, X-Key-Token and 
+			X-Key-Signature). Status codes are returned as they are, so
+			the application can decide how to respond.
+		"""
+		if isinstance(response := await self('before', **kwargs), dict):
+			self.screen = response.get('screen', str())
+			self.owner  = response.get('owner', None)
+			if not self.sid:
+				self.sid = response.get('xsid', str())
+			self.rid = response.get('rqid')
+		return response
+
+	async def after(self, status:str = str(),
+						  code:int = 200,
+						  content_type:str = str()) -> dict:
+		""" Finalize the request, returns the cookie directives to be set 
+			(or deleted if without value) on the response.
+		"""
+		if self.sid:
+			return await self('after', **{'status': status,
+										  'code': code,
+										  'content_type': content_type}) or dict()
+		return dict()
+
+	async def js(self, id:bytes = bytes(),
+					   minified:bool = True,
+					   debug:bool = True,
+					   host:str = str()):
+		if response := await self('js', **{'id': id,
+										   'minified': minified,
+										   'debug': debug,
+										   'host': host}):
+			if response.get('js'):
+				response['js'] = bytes(response.get('js', list()))
+			return response
+		return dict(status=False,
+					error='Internal service error.')
+
+	async def check(self, token:str = str()) -> bool:
+		if response := await self('check', **{'token': token,
+											  'reuse': False}):
+			return bool(response.get('status'))
+		return False
+
+	async def confirm(self, token:str = str(),
+							signature:str = str(),
+							reuse:bool = False) -> bool:
+		if response := await self('confirm', **{'token': token,
+												'signature': signature,
+												'reuse': reuse}):
+			return bool(response.get('status', False))
+		return False
+
+	async def clear(self) -> dict:
+		return await self('clear')
+
+	async def unlink(self) -> None:
+		await self('unlink')
+
+	async def exchange(self, key:bytes = bytes(), 
+							 hash:bytes = bytes(), 
+							 fingerprint:str = str(),
+							 browser:str = str(),
+							 product:str = str(),
+							 screen:str = str()) -> dict:
+		return await self('exchange', **{'key': key,
+										 'hash': hash,
+										 'fingerprint': fingerprint,
+										 'browser': browser,
+										 'product': product,
+										 'screen': screen})
+
+	async def validate(self, screen:bytes = bytes(), 
+							 nonce:bytes = bytes(), 
+							 token:Union[str, bytes] = str(), 
+							 signature:Union[str, bytes] = str()) -> dict:
+		""" A False status means the session can't be confirmed, the 
+			application should revoke the user session immediately.
+		"""
+		if response := await self('validate', **{'screen': screen,
+												 'nonce': nonce,
+												 'token': token,
+												 'signature': signature}):
+			return response
+		return dict(status=False)
+
+	async def webauthn(self, options:dict = dict()) -> dict:
+		return await self('webauthn', **{'options': options})
+
+	async def authenticate(self, credential:dict = dict()) -> dict:
+		return await self('credential', **{'credential': credential})
+
+	async def credential(self) -> bool:
+		return bool(await self('credential'))
+
+	async def open(self, screen:str = str(), 
+						 origin:str = str(), 
+						 path:str = str(),
+						 server:str = str()) -> None:
+		await self('open', **{'screen': screen,
+							  'origin': origin,
+							  'path': path,
+							  'server': server})
+
+	async def close(self, screen:str = str(), 
+						  origin:str = str(), 
+						  path:str = str()) -> None:
+		await self('close', **{'screen': screen,
+							   'origin': origin,
+							   'path': path})
+
+	async def sign(self, value:bytes) -> Any:
+		return await self('sign', **{'value': value}) or None
+
+	async def token(self) -> Any:
+		return await self('token') or None
+
+	async def verify(self, value:bytes = bytes(), 
+						   signature:bytes = bytes()) -> Any:
+		return await self('verify', **{'value': value,
+									   'signature': signature}) or None
+
+	async def protected(self, user:str = None,
+							  email:str = str(),
+							  state:bool = None) -> bool:
+		""" Read the protected mode of the device, or set it if `state` 
+			is given.
+		"""
+		return bool(await self('protected', **{'user': user,
+											   'email': email,
+											   'state': state if state is None else bool(state)}))
+
+	async def resiliency(self) -> bool:
+		return bool(await self('resiliency'))
+
+	async def window(self, state:bool = None) -> bool:
+		if state is None:
+			return bool(await self('window'))
+		return bool(await self('window', **{'state': bool(state)}))
+
+	async def has_window(self, user:str = str()) -> bool:
+		return bool(await self('has_window', **{'user': user}))
+
+	async def devices(self, user:str = str()):
+		return await self('devices', **{'user': user}) or dict()
+
+	async def nonce(self) -> str:
+		""" Re-keying nonce, generated only once per request processing.
+		"""
+		if not self.__nonce:
+			if response := await self('nonce'):
+				if nonce := unhexlify(response.get('nonce')):
+					self.__nonce = nonce
+					if signature := unhexlify(response.get('signature')):
+						self.__signature = signature
+		if self.__nonce:
+			return binascii.hexlify(self.__nonce).decode()
+		return str()
+
+	@property
+	def signature(self) -> str:
+		if self.__nonce and self.__signature:
+			return binascii.hexlify(self.__signature).decode()
+		return str()
@@ -0,0 +1,33 @@
+import logging
+
+from typing import Any
+
+class Events(object):
+
+	async def notify(self, **kwargs):
+		"""
+		Send request to sentinel with a value passed in kwargs argument
+		collection.
+
+		Args:
+		    `kwargs`: A collection of any kind key/value pairs.
+		Returns:
+		    The service response.
+		"""
+		return (await self('notify', **kwargs)).response
+
+	async def expose(self, url):
+		"""
+		Send to the relock exposed route address/name and register as
+		unprotected route.
+
+		Args:
+		    `url`: The route address exposed to the public.
+		Returns:
+		    The service response.
+		"""
+		self._exposed.add(url)
+		return (await self('expose', **{'url': url})).response
+
+	def exposed(self, url):
+		return url in self._exposed
@@ -0,0 +1,152 @@
+import time
+import asyncio
+import logging
+
+from collections import deque
+from contextlib import asynccontextmanager
+
+from ..tcp.pool import Exhausted
+from .socket import Socket
+
+class Pool(list):
+	""" Asyncio counterpart of `relock.tcp.pool.Pool`. Connections are 
+		opened lazily and handed out exclusively to one task at a time.
+	"""
+
+	size: int 		 = 1
+	host: str   	 = str()
+	port: int   	 = 0
+	expire: int 	 = 600
+	acquire: float 	 = 5.0
+	idle: float 	 = 30.0
+	codecs: list 	 = None
+	compress: int 	 = 0
+	connect: float 	 = None
+	retired: bool 	 = False
+
+	def __init__(self, host:str      = str(),
+					   port:int      = int(),
+					   pool:int      = 1,
+					   expire:int    = 600,
+					   acquire:float = 5.0,
+					   idle:float    = 30.0,
+					   codecs:list   = None,
+					   compress:int  = 0,
+					   connect:float = None):
+		self.host      = host
+		self.port      = port
+		self.size      = int(pool)
+		self.expire    = expire
+		self.acquire   = acquire
+		self.idle      = idle
+		self.codecs    = codecs
+		self.compress  = compress
+		self.connect   = connect
+		self.__cn__    = 1
+		self.opening   = 0
+		self.lock      = asyncio.Condition()
+		self.available = deque()
+
+	def __bool__(self):
+		return True if len(self) else False
+
+	async def __call__(self, host:str, port:int) -> Socket:
+		self.__cn__ = id = self.__cn__ + 1
+		conn = await Socket(host, port,
+							expire=self.expire,
+							idle=self.idle,
+							codecs=self.codecs,
+							compress=self.compress,
+							connect=self.connect,
+							id=id)()
+		self.append(conn)
+		return conn
+
+	async def fill(self):
+		""" Open the connections up to the size of the pool, dead idle
+			ones are replaced.
+		"""
+		for conn in [conn for conn in self.available if conn.closed]:
+			self.shutdown(conn)
+		if (missing := self.size - len(self) - self.opening) > 0:
+			#: The missing connections are opened concurrently.
+			self.opening += missing
+			try:
+				conns = await asyncio.gather(*[self(self.host, self.port) for x in range(missing)],
+											 return_exceptions=True)
+			finally:
+				self.opening -= missing
+			self.available.extend(conn for conn in conns if isinstance(conn, Socket))
+			async with self.lock:
+				self.lock.notify_all()
+			if not len(self) and (errors := [_ for _ in conns if isinstance(_, BaseException)]):
+				raise errors[0]
+		return len(self)
+
+	@asynccontextmanager
+	async def connection(self, timeout:float = None):
+		conn = await self.checkout(timeout)
+		try:
+			yield conn
+		finally:
+			await self.checkin(conn)
+
+	async def checkout(self, timeout:float = None) -> Socket:
+		if timeout is None:
+			timeout = self.acquire
+		async with self.lock:
+			try:
+				await asyncio.wait_for(self.lock.wait_for(lambda: self.available or \
+																	len(self) + self.opening < self.size), 
+									   timeout)
+			except asyncio.TimeoutError:
+				raise Exhausted('No idle connection to %s:%s within %ss.' % (self.host,
+																			 self.port,
+																			 timeout))
+			if self.available:
+				conn = self.available.pop()
+			else:
+				conn, self.opening = None, self.opening + 1
+		if conn is None:
+			try:
+				return await self(self.host, self.port)
+			finally:
+				async with self.lock:
+					self.opening -= 1
+					self.lock.notify()
+		if conn.closed or (conn.stale and not await conn.ping()):
+			self.shutdown(conn)
+			return await self(self.host, self.port)
+		conn.expire = time.time() + self.expire
+		return conn
+
+	async def checkin(self, conn:Socket):
+		async with self.lock:
+			if conn in self:
+				if self.retired:
+					conn.close()
+				if conn.closed:
+					super().remove(conn)
+				elif not conn in self.available:
+					self.available.append(conn)
+			self.lock.notify()
+
+	def shutdown(self, conn:Socket):
+		if conn in self.available:
+			self.available.remove(conn)
+		if conn in self:
+			super().remove(conn)
+		conn.close()
+		return self
+
+	def retire(self):
+		""" The server has left the cluster, idle connections are closed
+			now and the busy ones once they are returned.
+		"""
+		self.retired = True
+		for conn in list(self.available):
+			self.shutdown(conn)
+
+	def close(self):
+		for conn in list(self):
+			self.shutdown(conn)
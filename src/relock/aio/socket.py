@@ -0,0 +1,192 @@
+import time
+import zlib
+import socket
+import asyncio
+import logging
+
+from typing import Any
+
+from ..tcp.base import Base
+from ..tcp.codec import available, negotiate
+from ..tcp.socket import Socket as Connection, endpoint
+
+class Socket(Base):
+	""" Asyncio stream connection speaking exactly the same framing as the
+		blocking `relock.tcp.socket.Socket`.
+	"""
+
+	connected:bool 	 = False
+	idle:float 		 = 30.0
+	compression:str  = None
+	threshold:int 	 = 0
+	streaming:bool 	 = False
+	connect:float 	 = None
+
+	_bytes:int 		 = 3
+	_extended:int 	 = Connection._extended
+	_zlib:int 		 = Connection._zlib
+
+	#: The framing is shared with the blocking connection.
+	mask 			 = Connection.mask
+	header 			 = Connection.header
+	compress 		 = Connection.compress
+
+	def __init__(self, host:str, 
+					   port:int, 
+					   **kwargs):
+		self.__id__    = kwargs.get('id', 0)
+		self.addr      = (host, port)
+		self.expire    = time.time() + kwargs.get('expire', 600)
+		self.idle      = float(kwargs.get('idle', self.idle))
+		self.used      = time.time()
+		self.connected = False
+		self.codecs    = available(kwargs.get('codecs'))
+		self.threshold = int(kwargs.get('compress', self.threshold) or 0)
+		self.compression = None
+		self.streaming   = False
+		self.connect   = kwargs.get('connect', self.connect)
+		self.reader    = None
+		self.writer    = None
+
+	async def __call__(self):
+		if not self.connected:
+			try:
+				if (_ := endpoint(*self.addr))[0] == socket.AF_UNIX:
+					opening = asyncio.open_unix_connection(_[1])
+				else:
+					opening = asyncio.open_connection(*_[1])
+				self.reader, self.writer = await asyncio.wait_for(opening, self.connect)
+			except Exception as e:
+				logging.debug('Connection Refused %s:%s, host is down.', *self.addr)
+				raise ConnectionRefusedError('Host %s:%s is down.' % self.addr)
+			else:
+				self.connected = True
+				self.used = time.time()
+				try:
+					await asyncio.wait_for(self.hello(), self.connect)
+				except asyncio.TimeoutError:
+					self.close()
+					raise ConnectionRefusedError('Host %s:%s is down.' % self.addr)
+		return self
+
+	async def hello(self):
+		""" Announce the codecs supported by this client as the first frame
+			on the connection, see `relock.tcp.socket.Socket.hello`.
+		"""
+		reply = await self.roundtrip(**{'route': 'hello',
+										'codecs': self.codecs,
+										'compression': ['zlib'] if self.threshold else [],
+										'stream': True,
+										'pipeline': False})
+		self.codec = negotiate(reply)
+		if isinstance(reply, dict):
+			if self.threshold and reply.get('compression') == 'zlib':
+				self.compression = 'zlib'
+			self.streaming = bool(reply.get('stream'))
+		logging.debug('Codec %s, compression %s negotiated with %s:%s', self.codec.name, 
+																	  self.compression,
+																	  *self.addr)
+
+	@property
+	def id(self):
+		return self.__id__
+
+	@property
+	def closed(self) -> bool:
+		return self.writer is None or self.writer.is_closing()
+
+	@property
+	def stale(self) -> bool:
+		return bool(self.idle) and time.time() - self.used > self.idle
+
+	async def ping(self) -> bool:
+		try:
+			await self.sendall(b'PING')
+			return await self.recvall() == b'PONG'
+		except Exception as e:
+			logging.error(e)
+		return False
+
+	async def sendall(self, _:bytes = bytes()) -> int:
+		abs = len(_)
+		try:
+			compressed = False
+			if self.compression and abs > self.threshold:
+				if compressed := len(packed := self.compress(_)) < abs:
+					_ = packed
+			self.writer.writelines((self.header(len(_), compressed), _))
+			await self.writer.drain()
+		except (OSError, AttributeError) as e:
+			self.close()
+			raise ConnectionResetError('Host %s:%s has gone.' % self.addr)
+		else:
+			self.used = time.time()
+		return abs
+
+	async def recvall(self) -> bytes:
+		try:
+			abs = int.from_bytes(await self.reader.readexactly(self._bytes), byteorder='big')
+			if compressed := bool(self.compression and abs & self._zlib):
+				abs &= ~self._zlib
+			if abs == self.mask:
+				abs = int.from_bytes(await self.reader.readexactly(self._extended), byteorder='big')
+			if abs:
+				_ = await self.reader.readexactly(abs)
+				if compressed:
+					_ = zlib.decompress(_)
+			else:
+				_ = bytes()
+		except (OSError, EOFError, AttributeError) as e:
+			#: asyncio.IncompleteReadError is an EOFError, the peer has 
+			#: closed the connection in the middle of the frame.
+			self.close()
+			raise ConnectionResetError('Host %s:%s has gone.' % self.addr)
+		else:
+			self.used = time.time()
+		return _
+
+	async def roundtrip(self, **kwargs) -> Any:
+		if await self.sendall(self._encode(**kwargs)):
+			if _ := await self.recvall():
+				return self._decode(_)
+		raise ConnectionRefusedError('TCP Host is down.')
+
+	async def within(self, deadline:float = None, **kwargs) -> Any:
+		""" Round trip bounded by the deadline, a `time.monotonic()` value,
+			see `relock.tcp.socket.Socket.within`.
+		"""
+		if deadline is None:
+			return await self.roundtrip(**kwargs)
+		try:
+			return await asyncio.wait_for(self.roundtrip(**kwargs), deadline - time.monotonic())
+		except asyncio.TimeoutError:
+			self.close()
+			raise TimeoutError('No reply from %s:%s within the deadline.' % self.addr)
+
+	async def stream(self, **kwargs):
+		""" Yield the items of a streamed response chunk by chunk, see
+			`relock.tcp.socket.Socket.stream`.
+		"""
+		if not self.streaming:
+			for item in self._items(await self.roundtrip(**kwargs)):
+				yield item
+			return
+		await self.sendall(self._encode(**{**kwargs, 'stream': True}))
+		finished = False
+		try:
+			while _ := self._decode(await self.recvall()):
+				for item in self._items(_):
+					yield item
+			finished = True
+		finally:
+			if not finished:
+				self.close()
+
+	def close(self):
+		try:
+			if self.writer is not None and not self.writer.is_closing():
+				self.writer.close()
+		except Exception as e:
+			logging.debug(e)
+		finally:
+			self.connected = False
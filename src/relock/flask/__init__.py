@@ -34,23 +34,80 @@ bp = Blueprint(bp, __name__, url_prefix='/%s' % bp,
 						 	 static_folder='static',
 						 	 static_url_path='/static/%s' % bp)
 
+def flag(value:object) -> bool:
+	""" Boolean setting, '0', 'false', 'no' and 'off' from the environment
+		turn it off.
+	"""
+	if isinstance(value, str):
+		return value.strip().lower() not in ('', '0', 'false', 'no', 'off', 'none')
+	return bool(value)
+
 class Flask(object):
 
 	def __init__(self, app=None, host=None,
 								 port=8111,
 								 pool=1,
 								 ping=False,
-								 timeout=30):
+								 timeout=30,
+								 schema='tcp',
+								 acquire=5.0,
+								 idle=30.0,
+								 pipeline=False,
+								 codecs=None,
+								 compress=1024,
+								 affinity=False,
+								 balancer='round',
+								 health=5.0,
+								 deadline=5.0,
+								 deadlines=None,
+								 connect=1.0,
+								 budget=None,
+								 hedge=None,
+								 hedging=0.05,
+								 concurrency='auto',
+								 workers=4,
+								 backlog=1024,
+								 overflow='drop',
+								 events=100,
+								 linger=0.25,
+								 buffer=10000):
 
-		self.host    = str(os.environ.get('RELOCK_SERVICE_HOST', host))
+		self.host    = os.environ.get('RELOCK_SERVICE_HOST', host)
 		self.port    = int(os.environ.get('RELOCK_SERVICE_PORT', port))
 		self.pool    = int(os.environ.get('RELOCK_SERVICE_POOL', pool))
-		self.ping    = bool(os.environ.get('RELOCK_SERVICE_PING', ping))
+		self.ping    = flag(os.environ.get('RELOCK_SERVICE_PING', ping))
 		self.timeout = int(os.environ.get('RELOCK_SERVICE_TIMEOUT', timeout))
+		self.schema  = str(os.environ.get('RELOCK_SERVICE_SCHEMA', schema))
+		self.acquire = float(os.environ.get('RELOCK_SERVICE_ACQUIRE', acquire))
+		self.idle    = float(os.environ.get('RELOCK_SERVICE_IDLE', idle))
+		self.pipeline = flag(os.environ.get('RELOCK_SERVICE_PIPELINE', pipeline))
+		self.codecs  = os.environ.get('RELOCK_SERVICE_CODECS', codecs)
+		self.compress = int(os.environ.get('RELOCK_SERVICE_COMPRESS', compress))
+		self.affinity = flag(os.environ.get('RELOCK_SERVICE_AFFINITY', affinity))
+		self.balancer = os.environ.get('RELOCK_SERVICE_BALANCER', balancer)
+		self.health   = float(os.environ.get('RELOCK_SERVICE_HEALTH', health))
+		self.deadline = float(os.environ.get('RELOCK_SERVICE_DEADLINE', deadline))
+		self.deadlines = deadlines
+		self.connect  = float(os.environ.get('RELOCK_SERVICE_CONNECT', connect))
+		self.budget   = os.environ.get('RELOCK_SERVICE_BUDGET', budget)
+		self.hedge    = os.environ.get('RELOCK_SERVICE_HEDGE', hedge)
+		self.hedging  = float(os.environ.get('RELOCK_SERVICE_HEDGING', hedging))
+		self.concurrency = os.environ.get('RELOCK_SERVICE_CONCURRENCY', concurrency)
+		#: Endpoints and blueprints which never touch the relock service,
+		#: and the policy table of the endpoints, see `guarded`.
+		self.exempted = set()
+		self.bypass   = frozenset()
+		self.policy   = dict()
+		self.workers  = int(os.environ.get('RELOCK_SERVICE_WORKERS', workers))
+		self.backlog  = int(os.environ.get('RELOCK_SERVICE_BACKLOG', backlog))
+		self.overflow = os.environ.get('RELOCK_SERVICE_OVERFLOW', overflow)
+		self.events   = int(os.environ.get('RELOCK_SERVICE_EVENTS', events))
+		self.linger   = float(os.environ.get('RELOCK_SERVICE_LINGER', linger))
+		self.buffer   = int(os.environ.get('RELOCK_SERVICE_BUFFER', buffer))
 
+		self.tcp = None
 		if app is not None:
 			self.init_app(app)
-		self.tcp = None
 
 	def init_app(self, app, add_context_processor=True):
 		""" Configures an application. This registers an `before_request` call, and
@@ -65,12 +122,10 @@ class Flask(object):
 		"""
 		app.relock = self
 
-		if self.host is not None:
-			self.host    = str(os.environ.get('RELOCK_SERVICE_HOST', '127.0.0.1'))
-			self.port    = int(os.environ.get('RELOCK_SERVICE_PORT', 8111))
-			self.pool    = int(os.environ.get('RELOCK_SERVICE_POOL', 1))
-			self.ping    = bool(os.environ.get('RELOCK_SERVICE_PING', False))
-			self.timeout = int(os.environ.get('RELOCK_SERVICE_TIMEOUT', 30))
+		#: The environment and the arguments are read by the constructor,
+		#: only the host has no default there.
+		if self.host is None:
+			self.host = '127.0.0.1'
 
 		if hasattr(app, 'login_manager'):
 			# raise RuntimeError('Relock service requires Flask-Login to start first.')
@@ -81,8 +136,48 @@ class Flask(object):
 		app.config.setdefault('RELOCK_SERVICE_POOL', self.pool)
 		app.config.setdefault('RELOCK_SERVICE_PING', self.ping)
 		app.config.setdefault('RELOCK_SERVICE_TIMEOUT', self.timeout)
+		#: 'unix' if the host is the path of the unix domain socket of a 
+		#: co-located server, a unix:///path host works with either.
+		app.config.setdefault('RELOCK_SERVICE_SCHEMA', self.schema)
+		app.config.setdefault('RELOCK_SERVICE_ACQUIRE', self.acquire)
+		app.config.setdefault('RELOCK_SERVICE_IDLE', self.idle)
+		app.config.setdefault('RELOCK_SERVICE_PIPELINE', self.pipeline)
+		app.config.setdefault('RELOCK_SERVICE_CODECS', self.codecs)
+		app.config.setdefault('RELOCK_SERVICE_COMPRESS', self.compress)
+		app.config.setdefault('RELOCK_SERVICE_AFFINITY', self.affinity)
+		app.config.setdefault('RELOCK_SERVICE_BALANCER', self.balancer)
+		app.config.setdefault('RELOCK_SERVICE_HEALTH', self.health)
+		app.config.setdefault('RELOCK_SERVICE_DEADLINE', self.deadline)
+		#: Per route deadlines in seconds, e.g. {'exchange': 10.0}.
+		app.config.setdefault('RELOCK_SERVICE_DEADLINES', self.deadlines)
+		app.config.setdefault('RELOCK_SERVICE_CONNECT', self.connect)
+		app.config.setdefault('RELOCK_SERVICE_BUDGET', self.budget)
+		#: Routes safe to hedge, e.g. 'validate,before', and the cap of 
+		#: the hedged calls.
+		app.config.setdefault('RELOCK_SERVICE_HEDGE', self.hedge)
+		app.config.setdefault('RELOCK_SERVICE_HEDGING', self.hedging)
+		#: 'threads', 'gevent' or 'auto' (gevent if monkey-patched).
+		app.config.setdefault('RELOCK_SERVICE_CONCURRENCY', self.concurrency)
+		#: Workers and queue of the background calls, a full queue 'drop's
+		#: the call, makes the request 'block' or runs it 'inline'.
+		app.config.setdefault('RELOCK_SERVICE_WORKERS', self.workers)
+		app.config.setdefault('RELOCK_SERVICE_BACKLOG', self.backlog)
+		app.config.setdefault('RELOCK_SERVICE_OVERFLOW', self.overflow)
+		#: Login signals, tab beacons and notifications are sent by 
+		#: `events` in one frame at least every `linger` seconds, up to 
+		#: `buffer` of them wait. Zero `linger` sends each on its own.
+		app.config.setdefault('RELOCK_SERVICE_EVENTS', self.events)
+		app.config.setdefault('RELOCK_SERVICE_LINGER', self.linger)
+		app.config.setdefault('RELOCK_SERVICE_BUFFER', self.buffer)
 		app.config.setdefault('RELOCK_SERVICE_API', os.environ.get('RELOCK_SERVICE_API', str()))
 		app.config.setdefault('RELOCK_BLUEPRINT', os.environ.get('RELOCK_BLUEPRINT', 'relock'))
+		#: Comma separated endpoints skipping the relock service, e.g. the
+		#: health checks, and the methods which never need it.
+		app.config.setdefault('RELOCK_EXEMPT', os.environ.get('RELOCK_EXEMPT', str()))
+		app.config.setdefault('RELOCK_BYPASS', os.environ.get('RELOCK_BYPASS', 'OPTIONS'))
+
+		self.exempted.update(_.strip() for _ in str(app.config.get('RELOCK_EXEMPT') or str()).split(',') if _.strip())
+		self.bypass = frozenset(_.strip().upper() for _ in str(app.config.get('RELOCK_BYPASS') or str()).split(',') if _.strip())
 
 
 		with app.app_context():
@@ -92,8 +187,30 @@ class Flask(object):
 				self.tcp = TCP(host=app.config.get('RELOCK_SERVICE_HOST'),
 							   port=app.config.get('RELOCK_SERVICE_PORT'),
 							   pool=app.config.get('RELOCK_SERVICE_POOL'),
-							   ping=app.config.get('RELOCK_SERVICE_PING'),
-							   timeout=app.config.get('RELOCK_SERVICE_TIMEOUT'))
+							   ping=flag(app.config.get('RELOCK_SERVICE_PING')),
+							   timeout=app.config.get('RELOCK_SERVICE_TIMEOUT'),
+							   schema=app.config.get('RELOCK_SERVICE_SCHEMA'),
+							   acquire=app.config.get('RELOCK_SERVICE_ACQUIRE'),
+							   idle=app.config.get('RELOCK_SERVICE_IDLE'),
+							   pipeline=flag(app.config.get('RELOCK_SERVICE_PIPELINE')),
+							   codecs=app.config.get('RELOCK_SERVICE_CODECS'),
+							   compress=app.config.get('RELOCK_SERVICE_COMPRESS'),
+							   affinity=flag(app.config.get('RELOCK_SERVICE_AFFINITY')),
+							   balancer=app.config.get('RELOCK_SERVICE_BALANCER'),
+							   health=app.config.get('RELOCK_SERVICE_HEALTH'),
+							   deadline=app.config.get('RELOCK_SERVICE_DEADLINE'),
+							   deadlines=app.config.get('RELOCK_SERVICE_DEADLINES'),
+							   connect=app.config.get('RELOCK_SERVICE_CONNECT'),
+							   budget=float(_) if (_ := app.config.get('RELOCK_SERVICE_BUDGET')) is not None else None,
+							   hedge=app.config.get('RELOCK_SERVICE_HEDGE'),
+							   hedging=app.config.get('RELOCK_SERVICE_HEDGING'),
+							   concurrency=app.config.get('RELOCK_SERVICE_CONCURRENCY'),
+							   workers=app.config.get('RELOCK_SERVICE_WORKERS'),
+							   backlog=app.config.get('RELOCK_SERVICE_BACKLOG'),
+							   overflow=app.config.get('RELOCK_SERVICE_OVERFLOW'),
+							   events=app.config.get('RELOCK_SERVICE_EVENTS'),
+							   linger=app.config.get('RELOCK_SERVICE_LINGER'),
+							   buffer=app.config.get('RELOCK_SERVICE_BUFFER'))
 			except (SystemExit, KeyboardInterrupt):
 				sys.exit()
 			except Exception as e:
@@ -135,3 +252,46 @@ class Flask(object):
 
 		#: Expose the main route to the web app.
 		self.tcp.expose('/')
+		#: The endpoints known by now, the ones registered later are
+		#: added on their first request.
+		self.policy = {_.endpoint: self.decide(_.endpoint, app) for _ in app.url_map.iter_rules()}
+
+	def exempt(self, view):
+		""" Decorator of the views which never touch the relock service, 
+			e.g. health checks, a blueprint or an endpoint name exempts all 
+			its views. The requests of an exempt endpoint have no device.
+
+				@app.route('/health')
+				@relock.exempt
+				def health():
+					return 'ok'
+		"""
+		if isinstance(view, Blueprint):
+			self.exempted.add(view.name)
+		elif isinstance(view, str):
+			self.exempted.add(view)
+		else:
+			view.relock_exempt = True
+		self.policy.clear()
+		return view
+
+	def decide(self, endpoint:str, app:object = app) -> bool:
+		""" The endpoint needs the before and after exchange with the 
+			relock service, static files and exempt views don't.
+		"""
+		if not endpoint or 'static' in endpoint:
+			return False
+		if endpoint in self.exempted or endpoint.rpartition('.')[0] in self.exempted:
+			return False
+		return not getattr(app.view_functions.get(endpoint), 'relock_exempt', False)
+
+	def guarded(self, endpoint:str, method:str = 'GET') -> bool:
+		""" Single lookup in the policy table on every request, preflight 
+			requests skip the relock service as well. HEAD runs the GET view,
+			which may use the device, so it isn't bypassed by default.
+		"""
+		if method in self.bypass:
+			return False
+		if (_ := self.policy.get(endpoint)) is None:
+			_ = self.policy[endpoint] = self.decide(endpoint)
+		return _
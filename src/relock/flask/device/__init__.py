@@ -25,9 +25,10 @@ from datetime import (datetime,
 					  timedelta)
 
 from uuid import uuid4
-from typing import Any
+from typing import Any, Union
 
 from ...thread import Thread
+from ...tcp.codec import unhexlify
 from .login import Login
 
 class MetaRequest(type):
@@ -83,6 +84,7 @@ class Device(Login, metaclass=MetaRequest):
 		self.__screen    = bytes()
 		self.__owner     = False
 		self.__nonce     = bytes()
+		self.__reads     = dict()
 		self.__signature = bytes()
 		self.__cookie    = str(os.environ.get('RELOCK_COOKIE_NAME', 'X-Key-Data'))
 		self.__stamp     = str(os.environ.get('RELOCK_STAMP_NAME', 'X-Key-Stamp'))
@@ -195,6 +197,49 @@ class Device(Login, metaclass=MetaRequest):
 			self.response = tcp.response
 		return self
 
+	def read(self, route:str, **kwargs) -> Any:
+		""" Idempotent query memoized for the rest of the request, the
+			object lives as long as the request, so a template asking for
+			the credential several times makes a single call. A call
+			without a response isn't memoized.
+
+			Returns:
+				The service-side generated response for a call.
+		"""
+		if (key := (route, *sorted(kwargs.items()))) not in self.__reads:
+			with self(route, **kwargs) as tcp:
+				if tcp.response is None:
+					return None
+				self.__reads[key] = tcp.response
+		return self.__reads[key]
+
+	def forget(self) -> None:
+		""" Drop the memoized queries, a change of the device state 
+			makes them stale.
+		"""
+		self.__reads.clear()
+
+	def batch(self, *calls) -> list:
+		""" Several calls to the relock service in a single round trip.
+			Each call is either a route name or a (route, kwargs) tuple, 
+			the session and request ids are added to every call.
+
+				nonce, credential = request.device.batch('nonce', 'credential')
+
+			Returns:
+				List of the service-side responses in the order of calls, 
+				a failed call is returned as None.
+		"""
+		batch = list()
+		for call in calls:
+			route, kwargs = (call, dict()) if isinstance(call, str) else call
+			batch.append({'route': route,
+						  'sid': request.xsid,
+						  'rid': request.rqid,
+						  'host': self.host,
+						  **kwargs})
+		return self.relock.tcp.batch(batch)
+
 	def __enter__(self):
 		return self
  
@@ -320,6 +365,7 @@ class Device(Login, metaclass=MetaRequest):
 			Server side response does not matter as no data left anyway, 
 			so as a	result of this method we got always empty dictionary.
 		"""
+		self.forget()
 		with self('clear') as tcp:
 			return tcp.response
 		return None
@@ -329,6 +375,7 @@ class Device(Login, metaclass=MetaRequest):
 			about the device on server-side. This method is explictly used 
 			when user wants to unlink the passkey from the account.
 		"""
+		self.forget()
 		with self('unlink') as tcp:
 			return None
 		return dict(status=False,
@@ -386,8 +433,8 @@ class Device(Login, metaclass=MetaRequest):
 
 	def validate(self, screen:bytes = bytes(), 
 					   nonce:bytes = bytes(), 
-					   token:[str|bytes] = str(), 
-					   signature:[str|bytes] = str()) -> dict:
+					   token:Union[str, bytes] = str(), 
+					   signature:Union[str, bytes] = str()) -> dict:
 		""" The validate method is invoked by a browser every time when the key
 			has been rotated and/or needs confirmation. As a result the method 
 			returns a dictionary with a set of informations:
@@ -438,6 +485,7 @@ class Device(Login, metaclass=MetaRequest):
 				using `helpers.options_to_json()` in this library to 
 				quickly convert the options to JSON.
 		"""
+		self.forget()
 		with self('webauthn', **{'options': options}) as tcp:
 			return tcp.response
 
@@ -459,9 +507,7 @@ class Device(Login, metaclass=MetaRequest):
 			credential for passkey authentication. If credentail is 
 			assigned returns True.
 		"""
-		with self('credential') as tcp:
-			return bool(tcp.response)
-		return False
+		return bool(self.read('credential'))
 
 	def open(self, screen:str = str(), 
 				   origin:str = str(), 
@@ -479,11 +525,15 @@ class Device(Login, metaclass=MetaRequest):
 			Returns:
 				None
 		"""
-		with self('open', **{'screen': screen,
-							 'origin': origin,
-							 'path': path,
-							 'server': server}) as tcp:
-			return None
+		self.relock.tcp.emit(key=request.xsid and (request.xsid, screen),
+							 **{'route': 'open',
+								'sid': request.xsid,
+								'rid': request.rqid,
+								'host': self.host,
+								'screen': screen,
+								'origin': origin,
+								'path': path,
+								'server': server})
 
 	def close(self, screen:str = str(), 
 					origin:str = str(), 
@@ -503,10 +553,14 @@ class Device(Login, metaclass=MetaRequest):
 			Returns:
 				None
 		"""
-		with self('close', **{'screen': screen,
-							  'origin': origin,
-							  'path': path}) as tcp:
-			return None
+		self.relock.tcp.emit(key=request.xsid and (request.xsid, screen),
+							 **{'route': 'close',
+								'sid': request.xsid,
+								'rid': request.rqid,
+								'host': self.host,
+								'screen': screen,
+								'origin': origin,
+								'path': path})
 
 	def remote(self, screen:str = str()) -> dict:
 		""" Demo purpose only. This method emulates compromised key 
@@ -560,15 +614,14 @@ class Device(Login, metaclass=MetaRequest):
 
 			This turns on the strict device veryfication mode.
 		"""
-		with self('protected', **{'user': session.get('_user_id') or \
-										  session.get('identity'),
-								  'email': session.get('email', str()),
-								  'state': None}) as tcp:
-			return bool(tcp.response)
-		return False
+		return bool(self.read('protected', **{'user': session.get('_user_id') or \
+													  session.get('identity'),
+											  'email': session.get('email', str()),
+											  'state': None}))
 
 	@protected.setter
 	def protected(self, state:bool = None):
+		self.forget()
 		with self('protected', **{'user': session.get('_user_id') or \
 										  session.get('identity'),
 								  'email': session.get('email'),
@@ -579,28 +632,32 @@ class Device(Login, metaclass=MetaRequest):
 
 	@property
 	def resiliency(self):
-		with self('resiliency') as tcp:
-			return bool(tcp.response)
-		return False
+		return bool(self.read('resiliency'))
 
 	@property
 	def window(self):
-		with self('window') as tcp:
-			return bool(tcp.response)
-		return False
+		return bool(self.read('window'))
 
 	def has_window(self, user:str = str()):
 		with self('has_window', **{'user': user}) as tcp:
 			return bool(tcp.response)
 		return False
 
-	def devices(self, user:str() = str()):
+	def devices(self, user:str() = str(), stream:bool = False):
+		if stream:
+			#: Large tenants are listed chunk by chunk, the items are
+			#: (id, device) pairs.
+			return self.relock.tcp.stream('devices', **{'user': user,
+														'sid': request.xsid,
+														'rid': request.rqid,
+														'host': self.host})
 		with self('devices', **{'user': user}) as tcp:
 			return tcp.response
 		return dict()
 
 	@window.setter
 	def window(self, value:bool = True):
+		self.forget()
 		with self('window', **{'state': bool(value)}) as tcp:
 			return bool(tcp.response)
 		return False
@@ -668,9 +725,9 @@ class Device(Login, metaclass=MetaRequest):
 			#: multiple times about it.
 			with self('nonce') as tcp:
 				if tcp.response:
-					if nonce := binascii.unhexlify(tcp.response.get('nonce')):
+					if nonce := unhexlify(tcp.response.get('nonce')):
 						self.__nonce = nonce
-						if signature := binascii.unhexlify(tcp.response.get('signature')):
+						if signature := unhexlify(tcp.response.get('signature')):
 							self.__signature = signature
 		if self.__nonce:
 			return binascii.hexlify(self.__nonce).decode()
@@ -696,7 +753,9 @@ class Device(Login, metaclass=MetaRequest):
 			setattr(request, 'xsid', cls.xsid)
 			setattr(request, 'rqid', cls.rqid)
 
-			if request.endpoint and not 'static' in request.endpoint:
+			#: Static files, exempt views and preflight requests don't 
+			#: touch the relock service.
+			if app.relock.guarded(request.endpoint, request.method):
 				setattr(request, 'device', Device())
 
 
@@ -717,7 +776,7 @@ class Device(Login, metaclass=MetaRequest):
 		#: anyting if we are processing the /static path. Static files don't
 		#: set cookies.
 		if request.xsid:
-			if request.endpoint and not 'static' in request.endpoint:
+			if app.relock.guarded(request.endpoint, request.method):
 				#: Flask is closing TCP connection after request processing so
 				#: it's required to use fresh pipeline to finalize the operation.
 				#: New pipe may not neccessary be connected to the same relock 
@@ -22,13 +22,16 @@ from flask_login import (current_user as worker,
 						 user_accessed,
 						 session_protected)
 
-from ...thread import Thread
 
 class Login(object):
 
 	#: Sent when a user is logged in. In addition to the app (which is the
 	#: sender), it is passed `user`, which is the user being logged in.
-	@Thread.daemon
+	#: 
+	#: The login waits for the reply, a session revoked by the service 
+	#: isn't logged in. The other signals are events sent in batches off
+	#: the request path, a session revoked meanwhile is closed by the 
+	#: `before` call of the next request.
 	@user_logged_in.connect
 	def _user_logged_in(self, user):
 		if hasattr(self, 'relock'):
@@ -47,18 +50,14 @@ class Login(object):
 
 	#: Sent when a user is logged out. In addition to the app (which is the
 	#: sender), it is passed `user`, which is the user being logged out.
-	@Thread.daemon
 	@user_logged_out.connect
 	def _user_logged_out(self, *args, **kwargs):
 		if hasattr(self, 'relock'):
-			with self.relock.tcp(**{'route': 'user_logged_out',
+			self.relock.tcp.emit(**{'route': 'user_logged_out',
 								    'sid': request.xsid,
 								    'rid': request.rqid,
 								    'addr': request.remote_addr,
-								    'host': app.config.get('SERVER_HOST')}) as tcp:
-				if tcp.response in (407, 408, 410, 423):
-					if '_user_id' in session:
-						del session['_user_id']
+								    'host': app.config.get('SERVER_HOST')})
 
 	#: Sent when the user is loaded from the cookie. In addition to the app (which
 	#: is the sender), it is passed `user`, which is the user being reloaded.
@@ -93,27 +92,25 @@ class Login(object):
 
 	#: Sent whenever the user is accessed/loaded
 	#: receives no additional arguments besides the app.
-	@Thread.daemon
 	@user_accessed.connect
 	def _user_accessed(self, *args, **kwargs):
 		session.modified = True
 		#: send the beacon that informs the user status on 
 		#: web application side, if the session expires on 
 		#: the app side or user status has been change,
-		#: relock service must be notified about it.
+		#: relock service must be notified about it. The 
+		#: accesses of a session within the linger of the 
+		#: events are merged into the last one.
 		if request.endpoint:
 			if hasattr(self, 'relock'):
 				if not 'static' in request.endpoint:
-					with self.relock.tcp(**{'route': 'user_accessed',
+					self.relock.tcp.emit(key=request.xsid,
+										 **{'route': 'user_accessed',
 										    'sid': request.xsid,
 										    'rid': request.rqid,
 										    'user': session.get('_user_id'),
 										    'authenticated': True if session.get('_user_id') else False,
-										    'host': app.config.get('SERVER_HOST')}) as tcp:
-						if tcp.response in (407, 408, 410, 423):
-							if '_user_id' in session:
-								session.pop('_user_id')
-								abort(redirect('/'))
+										    'host': app.config.get('SERVER_HOST')})
 
 	#: Sent whenever session protection takes effect, and a session is either
 	#: marked non-fresh or deleted. It receives no additional arguments besides
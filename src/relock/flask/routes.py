@@ -28,7 +28,6 @@ import subprocess
 from datetime import datetime
 from datetime import timedelta
 from jsmin import jsmin
-from gevent import sleep
 
 from urllib.parse import urlparse
 
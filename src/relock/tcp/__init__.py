@@ -1,67 +1,351 @@
 import sys
 import time, logging
+import random
 import requests
 import pickle
 import binascii
 import hashlib
 import base64
 import socket
+import queue
 
 logging = logging.getLogger('sentinel.tcp.client')
 
 from typing import Any
 from uuid import uuid4
 
-from time import sleep
-
 from ..thread import Thread
+from ..thread.backend import backend
+from ..thread.worker import workers as tasks
 
 from .base import Base
-from .cluster import Cluster
+from .cluster import Cluster, candidates
+from .pool import Exhausted
+from .result import Result
+from .socket import address, UNIX
+from .retry import Budget, IDEMPOTENT, NEVER, budget as shared
+from .hedge import Hedge
+from .channel import Channel
+from . import fork
 from .events import Events
 
 from threading import Lock
 
 class TCP(Events, Base):
 
-	_response: Any = None
-
 	def __init__(self, host: list  = list(), 
 					   port: int   = 8111,
 					   pool: int   = 1,
 					   ping: bool  = False,
 					   timeout:int = 300,
-					   schema:str  = 'tcp'):
+					   schema:str  = 'tcp',
+					   acquire:float = 5.0,
+					   idle:float = 30.0,
+					   pipeline:bool = False,
+					   codecs:list = None,
+					   compress:int = 1024,
+					   affinity:bool = False,
+					   balancer:object = 'round',
+					   health:float = 5.0,
+					   deadline:float = 5.0,
+					   deadlines:dict = None,
+					   connect:float = 1.0,
+					   budget:float = None,
+					   idempotent:set = None,
+					   hedge:set = None,
+					   percentile:float = 95.0,
+					   hedging:float = 0.05,
+					   concurrency:str = 'auto',
+					   workers:int = 4,
+					   backlog:int = 1024,
+					   overflow:str = 'drop',
+					   events:int = 100,
+					   linger:float = 0.25,
+					   buffer:int = 10000):
+		#: 'threads', 'gevent' or 'auto' for gevent in a monkey-patched
+		#: process. The backend supplies the locks, queues, sockets and the
+		#: yield points, and applies to the whole process.
+		backend.use(concurrency)
+		#: Pool of the fire-and-forget calls, `backlog` of them are queued
+		#: and the `overflow` ones are dropped, block or run inline.
+		tasks.configure(workers, backlog, overflow)
 		self.id       = str(uuid4())
 		self.pool     = pool
 		self.ping     = ping
-		self.lock     = Lock()
-		self.servers  = []
-		self._exposed = []
+		self.acquire  = acquire
+		self.idle     = idle
+		#: Opt-in protocol mode, every frame carries a request id so many
+		#: requests can be in flight on a single connection.
+		self.pipeline = pipeline
+		#: Codecs announced to the service, by default all available in
+		#: this process with JSON as the fallback.
+		self.codecs   = codecs
+		#: Frames above this size in bytes are sent compressed, if the 
+		#: service supports it. Zero turns the compression off.
+		self.compress = compress
+		#: Route the calls of one session (the `sid` argument) to the same
+		#: server on a consistent hash ring.
+		self.affinity = affinity
+		#: Strategy spreading the other calls, 'round', 'least' (fewest
+		#: calls in flight), 'ewma' (peak EWMA latency) or a `Balancer`.
+		self.balancer = balancer
+		#: Interval in seconds of the background health checks, zero
+		#: turns them off.
+		self.health   = health
+		#: Seconds every call may take, retries included, and the per 
+		#: route exceptions. The sockets never wait longer than that, 
+		#: and the connect waits at most `connect` seconds.
+		self.deadline  = float(deadline) if deadline else None
+		self.deadlines = dict(deadlines or {})
+		self.connect   = float(connect) if connect else None
+		#: Ratio of the calls which may be retried, by default the budget
+		#: is shared by all clients of the process.
+		self.budget   = Budget(budget) if budget is not None else shared
+		#: Routes replayed when the request may have reached the server.
+		self.idempotent = frozenset(IDEMPOTENT if idempotent is None else idempotent) - NEVER
+		#: Opt-in routes safe to send twice, e.g. validate or before. A 
+		#: call slower than the `percentile` of its recent round trips is
+		#: duplicated to another server, for at most `hedging` of the calls.
+		self.hedge    = Hedge(hedge, percentile, hedging)
+		self.executor = backend.Executor(32, 'relock-hedge') if self.hedge else None
+		#: The events not awaiting a reply are buffered for up to `linger`
+		#: seconds and sent by `events` in a single frame, zero `linger`
+		#: sends every event on its own.
+		self.channel  = Channel(self, events, linger, buffer)
+		#: Guards the cluster bookkeeping only, every pool hands out its
+		#: sockets exclusively for the time of a round trip.
+		self.lock     = backend.Lock()
+		#: Only one topology refresh runs at a time.
+		self.refreshing = backend.Lock()
+		self.servers  = self.make()
+		#: Process the pools and the background threads belong to, a
+		#: forked child rebuilds them on its first call.
+		self.pid      = fork.pid
+		self.interval = timeout
+		self._exposed = set()
+		#: 'tcp', or 'unix' if the hosts are paths of unix domain sockets,
+		#: 'unix://' addresses are unix domain sockets either way.
+		self.schema   = schema
 		if not isinstance(host, list):
-			self.host = [(host, int(port)),]
+			host = [(host, port),]
+		self.host     = [address(*_, schema=schema) for _ in host]
+		started = time.perf_counter()
 		if round(self):
+			#: Warm-up, the members reported by the seed hosts are connected
+			#: before the first request as well.
+			round(self)
 			super().__init__()
-		self.refresh_sentinel_tenants(timeout)
+		#: Seconds it took to connect and fill the pools at startup.
+		self.warmup   = time.perf_counter() - started
+		logging.info('Relock warm-up took %.3fs, %s servers, %s connections', self.warmup,
+																			 len(self.servers),
+																			 sum(len(_.pool) for _ in self.servers))
+		self.spawn()
+
+	def __call__(self, route:str, **kwargs) -> Result:
+		""" Send the request and return its own immutable result, nothing
+			is stored on the client, so it can be shared by any number of
+			threads.
+
+				with tcp('get', key=key) as result:
+					return result.response
+		"""
+		if self.pid != fork.pid:
+			self.respawn()
+		started, status, response, addr = time.perf_counter(), 'down', None, None
+		deadline = self.expires(route)
+		#: The call sticks to the cluster snapshot it has started with.
+		servers, sent = self.servers, False
+		self.budget.deposit()
+		if route in self.hedge and len(servers) > 1:
+			if (result := self.hedged(servers, route, deadline, **kwargs)) is not None:
+				return Result(route, result[0], 'ok', time.perf_counter() - started, result[1])
+		#: A failed server is only reported to its circuit breaker, the
+		#: call moves on to the next one, every server is tried once.
+		for attempt in range(len(servers) + 1):
+			if deadline is not None and deadline <= time.monotonic():
+				status = 'timeout'
+				break
+			if sent and not self.retriable(route):
+				break
+			if (server := servers.route(kwargs.get('sid'))) is None:
+				break
+			addr, sent = (server.host, server.port), False
+			try:
+				with server, server.pool.connection(self.wait(deadline)) as conn:
+					rtt, sent = time.perf_counter(), True
+					response, status = conn.within(deadline, **{'route': route, **kwargs}), 'ok'
+					#: Feeds the latency aware balancers.
+					server.observe(time.perf_counter() - rtt)
+			except Exhausted as e:
+				logging.warning('Relock pool is busy, %s', e)
+				status = 'busy'
+			except TimeoutError as e:
+				logging.warning('Relock call %s to %s:%s has timed out, %s', route, server.host, server.port, e)
+				server.failure()
+				status = 'timeout'
+				continue
+			except (IndexError, OSError, ConnectionRefusedError):
+				logging.debug('Route to relock no longer exists, host {blue}%s:%s{z}{g} have gone down.', server.host, server.port)
+				server.failure()
+				server.pool.purge()
+				status = 'down'
+				continue
+			except Exception as e:
+				logging.error('No route to the TCP server host %s could be found.', e)
+				status = 'error'
+			else:
+				server.success()
+			break
+		return Result(route, response, status, time.perf_counter() - started, addr)
+
+	def send(self, server:object, route:str, deadline:float = None, **kwargs) -> Any:
+		""" A single round trip to the server, one leg of a hedged call.
+		"""
+		with server, server.pool.connection(self.wait(deadline)) as conn:
+			rtt = time.perf_counter()
+			response = conn.within(deadline, **{'route': route, **kwargs})
+			server.observe(time.perf_counter() - rtt)
+		server.success()
+		return response
+
+	def hedged(self, servers:Cluster, route:str, deadline:float = None, **kwargs) -> tuple:
+		""" Send the request and, if the reply is late, a duplicate to
+			another server, the first reply wins. The loser is cancelled if
+			it hasn't started yet, otherwise its reply is drained and the 
+			connection goes back to the pool. Returns the (response, server
+			address) pair, None if no leg has succeeded in time, then the 
+			call carries on as a regular one.
+		"""
+		if (server := servers.route(kwargs.get('sid'))) is None:
+			return None
+		self.hedge.budget.deposit()
+		started, legs, done = time.perf_counter(), dict(), backend.Queue()
+		def submit(server):
+			legs[future := self.executor.submit(self.send, server, route, deadline, **kwargs)] = server
+			#: Finished legs are queued in the order they complete.
+			future.add_done_callback(done.put)
+			return future
+		#: Only the round trips of the first leg are measured, the winners
+		#: alone would drag the threshold down.
+		def measure(future):
+			if not future.cancelled() and future.exception() is None:
+				self.hedge.record(route, time.perf_counter() - started)
+		submit(server).add_done_callback(measure)
+		remaining = lambda: max(deadline - time.monotonic(), 0) if deadline is not None else None
+		threshold, finished = self.hedge.threshold(route), 0
+		try:
+			while finished < len(legs):
+				if (timeout := remaining()) is not None and threshold is not None:
+					timeout = min(threshold, timeout)
+				elif threshold is not None:
+					timeout = threshold
+				try:
+					future = done.get(timeout=timeout)
+				except queue.Empty:
+					if threshold is None or remaining() == 0:
+						break
+					#: The reply is late, the call is hedged once at most.
+					threshold = None
+					if self.hedge.budget.withdraw() and (spare := servers.spare(server)) is not None:
+						logging.debug('Relock call %s to %s:%s is late, hedged to %s:%s', route, server.host,
+																							   server.port,
+																							   spare.host,
+																							   spare.port)
+						submit(spare)
+					continue
+				finished += 1
+				if (e := future.exception()) is None:
+					return future.result(), (legs[future].host, legs[future].port)
+				logging.debug('Hedged call %s to %s:%s failed, %s', route, legs[future].host,
+																		 legs[future].port, e)
+				if isinstance(e, TimeoutError):
+					legs[future].failure()
+				elif isinstance(e, (IndexError, OSError)):
+					legs[future].failure()
+					legs[future].pool.purge()
+		finally:
+			for future in legs:
+				future.cancel()
+
+	def expires(self, route:str) -> float:
+		""" Deadline of a call to the route as a `time.monotonic()` value,
+			None if the calls may take forever.
+		"""
+		if (timeout := self.deadlines.get(route, self.deadline)):
+			return time.monotonic() + float(timeout)
+
+	def wait(self, deadline:float = None) -> float:
+		""" How long to wait for a pooled connection.
+		"""
+		if deadline is None:
+			return self.acquire
+		return max(min(self.acquire, deadline - time.monotonic()), 0)
+
+	def retriable(self, route:str) -> bool:
+		""" A request which may have reached the server is replayed only
+			for idempotent routes, and only within the retry budget. Requests
+			which failed before being sent are always tried elsewhere.
+		"""
+		return route in self.idempotent and self.budget.withdraw()
+
+	def stream(self, route:str, **kwargs):
+		""" Iterate over the response of a list-style route chunk by chunk,
+			so large results are never held in memory at once. Items are the
+			list elements or the (key, value) pairs of a dict response.
+
+			The connection stays checked out until the generator is 
+			exhausted or closed. A busy pool, no routable server or a 
+			server gone raise, so a failure isn't taken for an empty list.
+		"""
+		if self.pid != fork.pid:
+			self.respawn()
+		if (server := self.servers.route(kwargs.get('sid'))) is None:
+			logging.warning('No relock server for the stream of %s', route)
+			raise ConnectionRefusedError('No relock server is routable.')
+		try:
+			with server.pool.connection() as conn:
+				yield from conn.stream(**{'route': route, **kwargs})
+		except Exhausted as e:
+			logging.warning('Relock pool is busy, %s', e)
+			raise
+		except (IndexError, OSError, ConnectionRefusedError):
+			logging.debug('Route to relock no longer exists, host {blue}%s:%s{z}{g} have gone down.', server.host, server.port)
+			server.failure()
+			raise
+
+	def batch(self, calls:list, results:bool = False) -> list:
+		""" Send several route payloads in a single frame, and so in a 
+			single round trip. Each call is a dict with the `route` key and 
+			its arguments. Returns the list of responses in the same order,
+			or the `Result` of each call with `results`, a failed call 
+			doesn't affect the others.
 
-	def __call__(self, route:str, **kwargs):
-		if self.servers:
-			with self.servers as server:
+			If the relock service doesn't understand the batch route, the 
+			calls are sent one by one. A batch which timed out or whose
+			server has gone may have run already, so it is never replayed,
+			all its calls are failed (None).
+		"""
+		calls, outcomes = [dict(call) for call in calls], list()
+		with self('batch', batch=calls) as tcp:
+			if isinstance(response := tcp.response, list) and \
+			   len(response) == len(calls):
+				outcomes = [Result(call.get('route'), reply, tcp.status, tcp.elapsed, tcp.server) \
+							for call, reply in zip(calls, response)]
+			elif not tcp.ok:
+				logging.warning('Batch of %s calls has failed, %s', len(calls), tcp.status)
+				outcomes = [Result(call.get('route'), None, tcp.status, tcp.elapsed, tcp.server) \
+							for call in calls]
+		if not outcomes:
+			logging.debug('Batch route is not supported by the relock service.')
+			for call in calls:
 				try:
-					with server.pool as conn:
-						if conn and conn._put(**{'route': route, **kwargs}):
-							self._response = conn._get()
-						else:
-							logging.debug('TCP server connection has gone. Rounding.')
-							if round(self, server):
-								return self(route, **kwargs)
-				except (IndexError, OSError, ConnectionRefusedError):
-					logging.debug('Route to relock no longer exists, host {blue}%s:%s{z}{g} have gone down.', server.host, server.port)
-					if round(self, server):
-						return self(route, **kwargs)
+					with self(**call) as tcp:
+						outcomes.append(tcp)
 				except Exception as e:
-					logging.error('No route to the TCP server host %s could be found.', e)
-		return self
+					logging.error('Batched call %s failed, %s', call.get('route'), e)
+					outcomes.append(Result(call.get('route'), None, 'error'))
+		return outcomes if results else [_.response for _ in outcomes]
 
 	def __abs__(self):
 		with self.servers as server:
@@ -72,78 +356,204 @@ class TCP(Events, Base):
 		return self
 
 	def __exit__(self, *args):
-		self._response = None
-		sleep(0)
+		backend.cooperate()
 
 	def __iter__(self):
-		for i in range(len(self.servers)):
-			yield self.servers[i]
-
-	def __round__(self, server:str = None):
-		if server is not None:
-			self.servers.remove(server)
-			logging.info('Serever %s:%s is down', server.host, server.port)
-		if self.servers:
-			with self('members') as self:
-				if self.response:
-					for id, sentinel in self.response.items():
-						if not (sentinel.get('addr'),
-								sentinel.get('port')) in self.servers:
-							try:
-								#: Try to add new server to the connection pooling
-								self.servers(sentinel.get('addr'), 
-											 sentinel.get('port'))
-							except:
-								#: Remove an unreachable server from the ring
-								if self.servers:
-									with self.servers as server:
-										try:
-											with server.pool as conn:
-												if conn and conn._put(**{'route': 'missing', **sentinel}):
-													_response = conn._get()
-										except:
-											logging.info('The attempt to remove the dead server %s:%s from the ring is unsuccessful.', 
-														sentinel.get('addr'),
-														sentinel.get('port'))
-										else:
-											logging.info('Remove an unreachable server %s:%s from the ring', 
-																sentinel.get('addr'),
-																sentinel.get('port'))
-							else:
-								logging.info('New server %s:%s in pool', 
-												sentinel.get('addr'),
-												sentinel.get('port'))
+		servers = self.servers
+		for i in range(len(servers)):
+			yield servers[i]
+
+	def __round__(self, server:object = None):
+		""" Refresh the topology. The next cluster snapshot is built from 
+			the members reported by the service, or from the configured
+			hosts if no server answers, and swapped in at once. Published
+			snapshots are never changed, requests in flight keep the one
+			they have started with.
+		"""
+		if not self.refreshing.acquire(blocking=False):
+			#: Another thread is refreshing already.
+			return len(self.servers)
+		try:
+			current, members, reported = self.servers, list(), False
+			if current:
+				with self('members') as tcp:
+					if tcp.ok and isinstance(tcp.response, dict):
+						members, reported = list(tcp.response.values()), True
+			if not members:
+				members = [{'addr': host, 'port': port} for host, port in self.host] + \
+						  [{'addr': _.host, 'port': _.port} for _ in current]
+			snapshot, members = current.fork(), candidates(members, self.host)
+			#: New servers are connected all at once rather than one by one.
+			opened = self.reach(snapshot, [addr for addr in members if (_ := current.find(addr)) is None \
+																		  or _ is server])
+			for addr, sentinel in members.items():
+				if addr not in opened:
+					snapshot.adopt(current.find(addr))
+				elif isinstance(_ := opened[addr], Exception):
+					logging.info('Server %s:%s is unreachable, %s', *addr, _)
+					if reported and not addr[0].startswith(UNIX):
+						#: Remove an unreachable server from the ring
+						with self('missing', **sentinel) as tcp:
+							if tcp.ok:
+								logging.info('Remove an unreachable server %s:%s from the ring', *addr)
+					continue
 				else:
-					for server in self.servers:
-						if not abs(server):
-							self.servers.remove(server)
-					if self.servers:
-						return round(self)
-		if not self.servers:
-			self.make()
+					snapshot.adopt(_)
+					logging.info('New server %s:%s in pool', *addr)
+				if 'weight' in sentinel:
+					snapshot.weigh(addr, sentinel.get('weight'))
+			#: The pools of the new servers are full before they get traffic.
+			self.warm([_ for _ in opened.values() if not isinstance(_, Exception)])
+			if not snapshot and not current:
+				raise ConnectionRefusedError('No relock server is reachable.')
+			if snapshot:
+				self.servers = snapshot
+				for _ in current:
+					if not (_.host, _.port) in snapshot:
+						logging.info('Serever %s:%s has left the cluster', _.host, _.port)
+						_.pool.retire()
+		finally:
+			self.refreshing.release()
 		logging.debug('Rounding routes, available: %s', len(self.servers))
 		return len(self.servers)
 
+	def reach(self, cluster:Cluster, addrs:list) -> dict:
+		""" Connect new servers for the cluster concurrently. Returns the
+			server, or the exception it failed with, by address.
+		"""
+		def open(addr):
+			try:
+				if (_ := cluster.open(*addr)) is None:
+					raise ConnectionRefusedError('Host %s:%s is down.' % addr)
+				return _
+			except Exception as e:
+				return e
+		if len(addrs) > 1:
+			with backend.Executor(min(len(addrs), 32), 'relock-warm') as executor:
+				return dict(zip(addrs, executor.map(open, addrs)))
+		return {addr: open(addr) for addr in addrs}
+
+	def warm(self, servers:list) -> int:
+		""" Fill the pools of the servers up to their size, all the 
+			connections are opened concurrently. Returns the number of 
+			connections opened.
+		"""
+		def fill(pool):
+			try:
+				return pool.fill()
+			except Exception as e:
+				logging.debug('Warm-up of %s:%s failed, %s', pool.host, pool.port, e)
+				return 0
+		#: Concurrent fills of one pool share the missing connections.
+		if pools := [_.pool for _ in servers for x in range(_.pool.size - len(_.pool))]:
+			with backend.Executor(min(len(pools), 32), 'relock-warm') as executor:
+				return sum(executor.map(fill, pools))
+		return 0
+
 	def make(self):
-		self.servers = Cluster(self.pool, 
-							   self.ping, 
-							   self.lock)
-		for host, port in self.host:
-			self.servers(host, port)
-		return len(self.servers)
+		""" Empty cluster with the client settings.
+		"""
+		return Cluster(self.pool, 
+					   self.ping, 
+					   self.lock,
+					   self.acquire,
+					   self.idle,
+					   self.pipeline,
+					   codecs=self.codecs,
+					   compress=self.compress,
+					   affinity=self.affinity,
+					   balancer=self.balancer,
+					   timeout=self.deadline,
+					   connect=self.connect)
+
+	def spawn(self):
+		""" Start the background threads.
+		"""
+		self.refresh_sentinel_tenants(self.interval)
+		if self.channel:
+			self.channel.start()
+		if self.ping and self.idle:
+			#: Connections sitting idle behind NAT or load balancers are
+			#: probed in the background instead of on the request path.
+			self.keepalive(self.idle)
+		if self.health:
+			self.healthcheck(self.health)
 
-	@property
-	def response(self):
-		return self._response
+	def respawn(self):
+		""" The client has been inherited by a forked child, e.g. a worker
+			of gunicorn --preload. The sockets are shared with the parent 
+			and the background threads haven't survived the fork, so the 
+			inherited descriptors are dropped, the servers get empty pools
+			connecting on the first checkout, and the threads are started
+			again in this process.
+		"""
+		with fork.lock:
+			if self.pid == fork.pid:
+				return
+			#: Any of the locks may have been held by a parent thread.
+			self.lock, self.refreshing = backend.Lock(), backend.Lock()
+			self.budget.lock, self.hedge.lock, self.hedge.budget.lock = Lock(), Lock(), Lock()
+			if self.executor is not None:
+				self.executor = backend.Executor(32, 'relock-hedge')
+			snapshot = self.make()
+			for server in self.servers:
+				server.pool.abandon()
+				snapshot.adopt(snapshot.open(server.host, server.port, 0))
+			self.servers, self.pid = snapshot, fork.pid
+			self.spawn()
+		logging.info('Relock client has been forked into process %s, the pools are rebuilt', self.pid)
 
 	def shutdown(self, how):
 		logging.info('Shutdown requested %s', how)
-		self._response = None
 		self.request.shutdown(how)
 		self.request.close()
 
+	@Thread.daemon
+	def keepalive(self, interval):
+		while True:
+			backend.sleep(interval)
+			for server in list(self.servers):
+				server.pool.keepalive()
+
+	def check(self, server:object) -> bool:
+		""" Probe the server off the request path. Ejected servers are
+			probed once their cooldown has passed and let back in half-open,
+			healthy ones have their dead idle connections dropped and the
+			pool refilled, so a failover finds warm connections.
+		"""
+		if server.state == 'ejected' and not server.due:
+			return False
+		try:
+			if server.state == 'ejected' and not abs(server):
+				raise ConnectionRefusedError('Host %s:%s is down.' % (server.host, server.port))
+			if self.ping:
+				server.pool.keepalive()
+			server.pool.fill()
+		except Exception as e:
+			logging.debug('Health check of %s:%s failed, %s', server.host, server.port, e)
+			if server.state == 'ejected':
+				server.eject()
+			else:
+				server.failure()
+			return False
+		else:
+			server.recover()
+		return True
+
+	@Thread.daemon
+	def healthcheck(self, interval):
+		while True:
+			backend.sleep(interval)
+			for server in list(self.servers):
+				self.check(server)
+
 	@Thread.daemon
 	def refresh_sentinel_tenants(self, timeout):
-		sleep(timeout);
-		if round(self):
-			return self.refresh_sentinel_tenants(timeout)
+		while True:
+			#: The jitter keeps the workers of a deployment from refreshing
+			#: in lockstep.
+			backend.sleep(timeout * random.uniform(0.8, 1.2))
+			try:
+				round(self)
+			except Exception as e:
+				logging.error('Refresh of the relock servers failed, %s', e)
@@ -0,0 +1,104 @@
+import math
+import time
+import random
+
+from itertools import count
+from threading import Lock
+
+class Load(object):
+	""" Load statistics of a cluster server, fed by the client with every
+		round trip. Mixed into the servers of the blocking and the asyncio
+		clusters.
+	"""
+
+	#: Calls currently waiting for a connection or a reply.
+	outstanding: int = 0
+	#: Peak EWMA of the round trip time in seconds.
+	ewma: float 	 = 0.0
+	#: Relative capacity announced by the service in `members`.
+	weight: float 	 = 1.0
+	#: Seconds for an old round trip time to lose most of its influence.
+	decay: float 	 = 10.0
+	stamp: float 	 = 0.0
+
+	def __post_init__(self):
+		#: Every server has its own lock, the calls to the different 
+		#: servers don't contend on the statistics.
+		self.__lock__ = Lock()
+		if (_ := getattr(super(), '__post_init__', None)) is not None:
+			_()
+
+	def __enter__(self):
+		with self.__lock__:
+			self.outstanding += 1
+		return self
+
+	def __exit__(self, *args):
+		with self.__lock__:
+			self.outstanding -= 1
+
+	@property
+	def latency(self) -> float:
+		""" The EWMA decayed for the time since the last observation, so a
+			server which was slow once gets probed again eventually.
+		"""
+		if self.stamp:
+			return self.ewma * math.exp(-(time.monotonic() - self.stamp) / self.decay)
+		return self.ewma
+
+	def observe(self, rtt:float):
+		""" Record the round trip time. A slower reply than the average is
+			taken as is (the peak), faster ones are averaged in with a
+			weight depending on the time since the previous one.
+		"""
+		with self.__lock__:
+			now = time.monotonic()
+			if rtt > self.ewma or not self.stamp:
+				self.ewma = rtt
+			else:
+				w = math.exp(-(now - self.stamp) / self.decay)
+				self.ewma = self.ewma * w + rtt * (1 - w)
+			self.stamp = now
+
+class Balancer(object):
+	""" Picks the server for a call out of the routable ones, the base 
+		one is round-robin. Custom strategies subclass it and implement 
+		`__call__`.
+	"""
+
+	def __init__(self):
+		self.counter = count()
+
+	def __call__(self, servers:list):
+		if servers:
+			return servers[next(self.counter) % len(servers)]
+
+class LeastOutstanding(Balancer):
+	""" The server with the fewest calls in flight relative to its weight,
+		ties are broken at random.
+	"""
+
+	def __call__(self, servers:list):
+		if servers := list(servers):
+			random.shuffle(servers)
+			return min(servers, key=lambda server: (server.outstanding + 1) / server.weight)
+
+class PeakEWMA(Balancer):
+	""" The cheaper of two random servers, the cost being the peak EWMA
+		latency scaled by the calls in flight and the weight. Servers
+		without a measurement cost nothing, so new members are tried first.
+	"""
+
+	def __call__(self, servers:list):
+		if len(servers) > 2:
+			servers = random.sample(servers, 2)
+		if servers:
+			return min(servers, key=self.cost)
+
+	@staticmethod
+	def cost(server:Load) -> float:
+		return server.latency * (server.outstanding + 1) / server.weight
+
+balancers = {'round': Balancer,
+			 'least': LeastOutstanding,
+			 'ewma': PeakEWMA}
@@ -4,53 +4,80 @@ import ujson as json
 import logging
 
 from typing import Any
-from gevent import sleep
+
+from ..thread.backend import backend
+from .codec import Json
 
 class Base(object):
 
+	#: Codec negotiated for the connection, JSON until the service agrees
+	#: to something else.
+	codec: type = Json
+
 	def _get(self, _:bytes = bytes(), abs:int = 0):
 		try:
 			_ = self.recvall()
+		except OSError as e:
+			#: Timeouts and resets are left to the caller to retry or not.
+			logging.error('Recive faild %s', e)
+			raise
 		except Exception as e:
 			logging.error('Recive faild %s', e)
 		else:
 			if _ == b'PING':
-				self.request.sendall(b'PONG')
-			elif _ == b'PONG':
-				pass
-			elif _ == b'False':
-				_ = False
-			elif _ == b'True':
-				_ = True
-			elif _ == b'None':
-				_ = None
+				self.sendall(b'PONG')
 			elif _ == b'SHUTDOWN':
 				if self.connected:
 					self.shutdown(2)
 			elif _:
-				try:
-					_ = json.loads(_)
-				except Exception as e:
-					logging.error('Socket decode faild. %s', e)
-					logging.debug(_)
+				_ = self._decode(_)
 			else:
 				raise ConnectionRefusedError('TCP Host is down.')
 		finally:
-			sleep(0)
+			backend.cooperate()
 		# print('got:', _)
 		return _
 
 	def _put(self, _: bytes = bytes(), offset: int = 0, **kwargs) -> Any:
+		if _ := self._encode(_, **kwargs):
+			_ = self.sendall(_)
+		# print('snd:', _)
+		return _
+
+	def _encode(self, _: bytes = bytes(), **kwargs) -> bytes:
 		if not len(kwargs) and _ == b'':
 			_ = None #Can't send a null byte
 		if not len(kwargs) and isinstance(_, (bool, type(None))):
-			if _ := str(_).encode():
-				_ = self.sendall(_)
+			return str(_).encode()
 		elif isinstance(_, bytes) and not len(kwargs):
-			_ = self.sendall(_)
-		else:
-			if _ := json.dumps(_ if _ else kwargs, 
-							   separators=(', ', ':')).encode():
-				_ = self.sendall(_)
-		# print('snd:', _)
+			return _
+		return self.codec.dumps(_ if _ else kwargs)
+
+	@staticmethod
+	def _items(_: Any):
+		""" Items of a response chunk, list elements or (key, value) 
+			pairs of a dict.
+		"""
+		if isinstance(_, dict):
+			yield from _.items()
+		elif isinstance(_, (list, tuple)):
+			yield from _
+		elif _ is not None:
+			yield _
+
+	def _decode(self, _: bytes) -> Any:
+		if _ in (b'PING', b'PONG', b'SHUTDOWN'):
+			pass
+		elif _ == b'False':
+			_ = False
+		elif _ == b'True':
+			_ = True
+		elif _ == b'None':
+			_ = None
+		elif _:
+			try:
+				_ = self.codec.loads(_)
+			except Exception as e:
+				logging.error('Socket decode faild. %s', e)
+				logging.debug(_)
 		return _
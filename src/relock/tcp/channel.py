@@ -0,0 +1,124 @@
+import atexit
+import logging
+
+logging = logging.getLogger('sentinel.tcp.client')
+
+from ..thread import Thread
+from ..thread.backend import backend
+from ..thread.worker import workers
+
+class Channel(object):
+	""" Buffer of the fire-and-forget events, the notifications, login
+		signals and tab beacons which don't need a reply on the request
+		path. The events are sent together in a single batch frame when
+		`size` of them are buffered or `linger` seconds have passed.
+
+		An event with the same route and `key` as a buffered one replaces
+		it and moves to the end, so several `user_accessed` of a session
+		within the linger go out as one and the order of the routes of a
+		key is kept. Once `capacity` events are buffered the new ones are
+		dropped.
+	"""
+
+	def __init__(self, tcp:object, size:int = 100,
+								   linger:float = 0.25,
+								   capacity:int = 10000):
+		self.tcp      = tcp
+		self.size     = max(int(size), 1)
+		self.linger   = float(linger)
+		self.capacity = max(int(capacity), self.size)
+		self.buffer   = dict()
+		self.ready    = backend.Condition()
+		#: Counters of the events, see `stats`.
+		self.emitted  = 0
+		self.merged   = 0
+		self.dropped  = 0
+		self.flushed  = 0
+		self.failed   = 0
+		self.frames   = 0
+		atexit.register(self.flush)
+
+	def __bool__(self) -> bool:
+		return self.linger > 0
+
+	def __len__(self) -> int:
+		return len(self.buffer)
+
+	def emit(self, route:str, key:object = None, **kwargs) -> bool:
+		""" Buffer the event, False if it has been dropped. Without the key,
+			or with an empty one, e.g. the session id of a visitor who has
+			none yet, events are never merged.
+		"""
+		with self.ready:
+			self.emitted += 1
+			if (key := (route, key) if key else object()) in self.buffer:
+				del self.buffer[key]
+				self.merged += 1
+			elif len(self.buffer) >= self.capacity:
+				if not self.dropped % 1000:
+					logging.warning('Relock event buffer is full, %s events dropped', self.dropped + 1)
+				self.dropped += 1
+				return False
+			self.buffer[key] = {'route': route, **kwargs}
+			if len(self.buffer) >= self.size:
+				self.ready.notify()
+		return True
+
+	def take(self) -> list:
+		with self.ready:
+			events, self.buffer = list(self.buffer.values()), dict()
+		return events
+
+	def send(self, events:list) -> bool:
+		""" Deliver the events. An event has failed if its call raised or 
+			got no reply frame, the routes like `close` legitimately reply
+			with nothing.
+		"""
+		for _ in range(0, len(events), self.size):
+			chunk = events[_:_ + self.size]
+			try:
+				results = self.tcp.batch(chunk, results=True)
+			except Exception as e:
+				logging.error('Relock events have not been delivered, %s', e)
+				results = list()
+			failed = len(chunk) - sum(1 for result in results if result.ok)
+			with self.ready:
+				self.flushed += len(chunk) - failed
+				self.failed  += failed
+				self.frames  += failed < len(chunk)
+		return bool(events)
+
+	def flush(self) -> bool:
+		""" Send the buffered events right away, at shutdown.
+		"""
+		return self.send(self.take())
+
+	def start(self):
+		""" Start the flusher, again in a forked child, which leaves the
+			events of the parent to the parent.
+		"""
+		self.buffer, self.ready = dict(), backend.Condition()
+		self.flusher()
+
+	@Thread.daemon
+	def flusher(self):
+		while True:
+			with self.ready:
+				self.ready.wait_for(lambda: len(self.buffer) >= self.size, self.linger)
+			if events := self.take():
+				#: Delivered by the shared pool of the background calls, so a
+				#: slow service doesn't hold up the collection of the next
+				#: batch. The pool is flushed at exit after the channel.
+				if not workers.submit(self.send, events):
+					with self.ready:
+						self.dropped += len(events)
+
+	@property
+	def stats(self) -> dict:
+		return {'emitted': self.emitted,
+				'merged': self.merged,
+				'dropped': self.dropped,
+				'flushed': self.flushed,
+				'failed': self.failed,
+				'frames': self.frames,
+				'buffered': len(self.buffer)}
@@ -4,15 +4,21 @@ import sys
 import socket
 import signal
 
+from bisect import bisect
+from hashlib import blake2b
+from functools import lru_cache
 from dataclasses import dataclass
 from contextlib import closing
 
-from .socket import Socket
+from .socket import Socket, endpoint, address, UNIX
 from .pool import Pool
+from .pipeline import Multiplex
+from .balancer import Load, Balancer, balancers
+from .health import Breaker
 
 
 @dataclass
-class Server:
+class Server(Load, Breaker):
 	
 	host: str        = str()
 	port: int 	     = 0
@@ -20,14 +26,16 @@ class Server:
 	pool: object     = None
 
 	def __bool__(self):
-		with self.pool as conn:
-			return bool(conn)
-		return False
+		#: Liveness of the connections is tracked passively by the pool, 
+		#: there is no need for a PING round trip to pick a server.
+		return self.pool is not None
 
 	def __abs__(self, _:bool = False):
 		try:
-			with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as sock:
-				if sock.connect_ex((self.host, self.port)) == 0:
+			family, addr = endpoint(self.host, self.port)
+			with closing(socket.socket(family, socket.SOCK_STREAM)) as sock:
+				sock.settimeout(getattr(self.pool, 'connect', None))
+				if sock.connect_ex(addr) == 0:
 					_ = True
 		except Exception as e:
 			logging.info('pre-connect to server - The TCP host is no longer operational.')
@@ -35,19 +43,129 @@ class Server:
 			logging.info('pre-connect to server - The TCP connection has been checked and it is valid.')
 		return _
 
+@lru_cache(maxsize=1)
+def addresses() -> frozenset:
+	""" Names and addresses of this host.
+	"""
+	try:
+		name, aliases, addrs = socket.gethostbyname_ex(hostname := socket.gethostname())
+	except OSError:
+		return frozenset()
+	return frozenset((hostname, name, *aliases, *addrs))
+
+def local(host:str) -> bool:
+	""" The server is on this host.
+	"""
+	if host in ('localhost', '::1') or str(host).startswith('127.'):
+		return True
+	return host in addresses()
+
+def candidates(members:list, hosts:list) -> dict:
+	""" Members of the next snapshot by address. A server reports itself
+		by its network address, the unix domain sockets of the co-located
+		servers are known only from the configured hosts. Discovery keeps
+		them and drops the network address of the same servers, otherwise
+		they would be in the cluster twice. The servers on this host are
+		taken as the co-located ones if there are no more of them than
+		unix sockets.
+	"""
+	_ = dict()
+	for sentinel in members:
+		_.setdefault(address(sentinel.get('addr'), sentinel.get('port') or 0), sentinel)
+	if seeds := [(host, port) for host, port in hosts if host.startswith(UNIX)]:
+		if len(colocated := [addr for addr in _ if not addr[0].startswith(UNIX) \
+													and local(addr[0])]) <= len(seeds):
+			for addr in colocated:
+				del _[addr]
+		for host, port in seeds:
+			_.setdefault((host, port), {'addr': host, 'port': port})
+	return _
+
+class Ring(object):
+	""" Consistent hash ring of server addresses. Every server owns a 
+		number of virtual nodes, so adding or removing one of N servers 
+		moves only about 1/N of the keys.
+
+		The points and their owners are swapped as a single immutable 
+		snapshot, lookups never see a half updated ring.
+	"""
+
+	replicas: int = 160
+
+	def __init__(self, replicas:int = 160):
+		self.replicas = int(replicas)
+		self.state    = (tuple(), dict())
+
+	def __len__(self):
+		return len(self.state[0])
+
+	@staticmethod
+	def hash(key:str) -> int:
+		return int.from_bytes(blake2b(str(key).encode(), digest_size=8).digest(), byteorder='big')
+
+	def add(self, addr:tuple):
+		points, owners = self.state
+		owners = {**owners, **{self.hash('%s:%s#%s' % (*addr, i)): addr for i in range(self.replicas)}}
+		self.state = (tuple(sorted(owners)), owners)
+
+	def discard(self, addr:tuple):
+		owners = {point: owner for point, owner in self.state[1].items() if owner != addr}
+		self.state = (tuple(sorted(owners)), owners)
+
+	def lookup(self, key:str) -> tuple:
+		""" Address of the server owning the key, the first point on the
+			ring clockwise from the hash of the key.
+		"""
+		points, owners = self.state
+		if points:
+			return owners[points[bisect(points, self.hash(key)) % len(points)]]
+
 class Cluster(list):
 
-	ping: bool  = False
-	pool: int 	= 1
+	ping: bool  	= False
+	pool: int 		= 1
+	acquire: float 	= 5.0
+	idle: float 	= 30.0
+	pipeline: bool 	= False
+	codecs: list 	= None
+	compress: int 	= 0
+	affinity: bool 	= False
+	balancer: object = None
+	timeout: float 	= None
+	connect: float 	= None
 
 	__id__: int = 0
 
 	def __init__(self, pool:int = 1, 
 					   ping:bool = False,
-					   lock:object = None):
-		self.pool = int(pool)
-		self.ping = bool(ping)
-		self.lock = lock
+					   lock:object = None,
+					   acquire:float = 5.0,
+					   idle:float = 30.0,
+					   pipeline:bool = False,
+					   codecs:list = None,
+					   compress:int = 0,
+					   affinity:bool = False,
+					   balancer:object = 'round',
+					   timeout:float = None,
+					   connect:float = None):
+		self.pool     = int(pool)
+		self.ping     = bool(ping)
+		self.lock     = lock
+		self.acquire  = float(acquire)
+		self.idle     = float(idle)
+		self.pipeline = bool(pipeline)
+		self.codecs   = codecs
+		self.compress = int(compress or 0)
+		#: Calls of one session are routed to the same server, so they 
+		#: benefit from the server side session cache.
+		self.affinity = bool(affinity)
+		self.ring     = Ring()
+		#: Strategy picking the server for calls without affinity, the 
+		#: name of a built-in one or a `Balancer` instance.
+		self.balancer = balancers[balancer]() if isinstance(balancer, str) else balancer or Balancer()
+		#: Connect and I/O timeouts of the sockets in seconds.
+		self.timeout  = timeout
+		self.connect  = connect
 
 	def __enter__(self):
 		return next(self)
@@ -57,17 +175,63 @@ class Cluster(list):
 
 	def __call__(self, host:str, port:int):
 		if not (host, port) in self:
-			if _ := Server(host,
-						   port,
-						   self.ping,
-						   Pool(host, 
-						   		port, 
-						   		self.pool, 
-						   		self.ping,
-						   		self.lock)):
-				if abs(_):
-					self.append(_)
-					return _
+			if (_ := self.open(host, port)) is not None:
+				return self.adopt(_)
+
+	def open(self, host:str, port:int, warm:int = 1) -> Server:
+		""" Connect a new server without adding it to the cluster, so many
+			of them can be connected at once. The first pooled connection
+			proves the server is up, the port is probed only if there is
+			none. With no warm connections the server isn't checked at all,
+			the pool connects on the first checkout.
+		"""
+		if _ := Server(host,
+					   port,
+					   self.ping,
+					   (Multiplex if self.pipeline else Pool)(host, 
+					   		port, 
+					   		self.pool, 
+					   		self.ping,
+					   		acquire=self.acquire,
+					   		idle=self.idle,
+					   		codecs=self.codecs,
+					   		compress=self.compress,
+					   		timeout=self.timeout,
+					   		connect=self.connect,
+					   		warm=warm)):
+			if not warm or _.pool or abs(_):
+				return _
+
+	def fork(self):
+		""" Empty cluster with the same settings and balancer. The next
+			snapshot is built on it while this one keeps serving.
+		"""
+		return Cluster(self.pool,
+					   self.ping,
+					   self.lock,
+					   self.acquire,
+					   self.idle,
+					   self.pipeline,
+					   codecs=self.codecs,
+					   compress=self.compress,
+					   affinity=self.affinity,
+					   balancer=self.balancer,
+					   timeout=self.timeout,
+					   connect=self.connect)
+
+	def adopt(self, server:Server) -> Server:
+		""" Carry the server over from the previous snapshot, together 
+			with its pool, load statistics and breaker state.
+		"""
+		if not (server.host, server.port) in self:
+			self.append(server)
+			self.ring.add((server.host, server.port))
+		return server
+
+	def find(self, addr:tuple) -> Server:
+		for server in self:
+			if server.host == addr[0] and server.port == addr[1]:
+				return server
 
 	def __iter__(self):
 		for i in range(len(self)):
@@ -89,10 +253,37 @@ class Cluster(list):
 			self.__id__ = 0
 		self.__id__ += 1
 		if _ := len(self):
-			if server := self[self.__id__ - 1]:
+			if (server := self[self.__id__ - 1]) is not None:
 				# if abs(server):
 				return server
 
+	def route(self, key:str = None) -> Server:
+		""" Server for the session key when affinity routing is on, calls
+			without a session are spread by the balancer.
+		"""
+		#: Ejected servers are out of the rotation, unless all of them 
+		#: are, then it's better to try than to fail right away.
+		servers = [server for server in self if server.routable] or list(self)
+		if self.affinity and key:
+			if (addr := self.ring.lookup(key)) is not None:
+				for server in servers:
+					if server.host == addr[0] and server.port == addr[1]:
+						return server
+		return self.balancer(servers)
+
+	def spare(self, server:Server) -> Server:
+		""" Another routable server for the duplicate of a hedged call.
+		"""
+		return self.balancer([_ for _ in self if _ is not server and _.routable])
+
+	def weigh(self, addr:tuple, weight:float):
+		""" Set the relative capacity of the server announced by the 
+			service.
+		"""
+		for server in self:
+			if server.host == addr[0] and server.port == addr[1]:
+				server.weight = max(float(weight), 0.001)
+
 	def __bool__(self):
 		# for server in self:
 		# 	if not abs(server):
@@ -106,4 +297,5 @@ class Cluster(list):
 			if server == item:
 				super().remove(server)	
 			elif server.host == item.host and server.port == item.port:
-				super().remove(server)
\ No newline at end of file
+				super().remove(server)
+		self.ring.discard((item.host, item.port))
\ No newline at end of file
@@ -0,0 +1,70 @@
+import ujson as json
+import logging
+import binascii
+
+from typing import Any, Union
+
+try:
+	import msgpack
+except ImportError:
+	msgpack = None
+
+class Json(object):
+	""" Default codec, understood by every relock service.
+	"""
+
+	name: str = 'json'
+
+	@staticmethod
+	def dumps(_: Any) -> bytes:
+		return json.dumps(_, separators=(',', ':')).encode()
+
+	@staticmethod
+	def loads(_: bytes) -> Any:
+		return json.loads(_)
+
+class MessagePack(object):
+	""" Compact binary codec, carries bytes natively so binary values 
+		don't need to travel as hex strings or lists of integers.
+	"""
+
+	name: str = 'msgpack'
+
+	@staticmethod
+	def dumps(_: Any) -> bytes:
+		return msgpack.packb(_, use_bin_type=True)
+
+	@staticmethod
+	def loads(_: bytes) -> Any:
+		return msgpack.unpackb(_, raw=False)
+
+#: Codecs available in this process, in the order of preference.
+codecs = {Json.name: Json}
+if msgpack is not None:
+	codecs = {MessagePack.name: MessagePack, **codecs}
+
+def available(names:list = None) -> list:
+	""" Filter the requested codec names down to the ones that can be used
+		in this process, JSON is always kept as the fallback.
+	"""
+	if names is None:
+		names = list(codecs)
+	if isinstance(names, str):
+		names = [name.strip() for name in names.split(',')]
+	return [name for name in names if name in codecs and name != Json.name] + [Json.name]
+
+def negotiate(reply:Any) -> type:
+	""" Pick the codec from the service reply to the `hello` announcement,
+		anything not understood means the service speaks JSON only.
+	"""
+	if isinstance(reply, dict) and reply.get('codec') in codecs:
+		return codecs[reply.get('codec')]
+	return Json
+
+def unhexlify(_: Union[str, bytes]) -> bytes:
+	""" Binary values come raw with a binary codec and hexlified with JSON,
+		both are accepted.
+	"""
+	if isinstance(_, (bytes, bytearray)):
+		return bytes(_)
+	return binascii.unhexlify(_ or str())
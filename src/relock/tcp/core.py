@@ -10,8 +10,8 @@ class Core(Events):
 		pass
 
 	def get(self, key:str):
-		with self('get', key=key) as _:
-			return self.response
+		with self('get', key=key) as result:
+			return result.response
 
 	def set(self, key:str, value:Any):
 		with self('set', key=key, value=value) as self:
@@ -25,7 +25,9 @@ class Core(Events):
 		with self('exists', key=key) as self:
 			return self.response
 
-	def keys(self, key:str):
+	def keys(self, key:str, stream:bool = False):
+		if stream:
+			return self.stream('keys', key=key)
 		with self('keys', key=key) as self:
 			return self.response
 
@@ -45,7 +47,9 @@ class Core(Events):
 						  value=kwargs) as self:
 			return self.response
 
-	def zrange(self, key:str, x:int=0, y:int=-1):
+	def zrange(self, key:str, x:int=0, y:int=-1, stream:bool = False):
+		if stream:
+			return self.stream('zrange', key=key, x=x, y=y)
 		with self('zrange', key=key, x=0, y=-1) as self:
 			return self.response
 
@@ -65,6 +69,8 @@ class Core(Events):
 		with self('srem', key=key, **kwargs) as self:
 			return self.response
 
-	def smembers(self, key:str, **kwargs):
+	def smembers(self, key:str, stream:bool = False, **kwargs):
+		if stream:
+			return self.stream('smembers', key=key)
 		with self('smembers', key=key) as self:
 			return self.response
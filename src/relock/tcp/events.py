@@ -15,16 +15,32 @@ class Events(object):
 
 	def notify(self, **kwargs):
 		"""
-		Event creates of a new thread-specific connection, and send request to 
-		sentinel with a value passed in kwargs argument collection.
+		Send the notification to sentinel with a value passed in kwargs
+		argument collection, batched with the other events.
 
 		Args:
 		    `kwargs`: A collection of any kind key/value pairs.
 		Returns:
-		    None
+		    False if the event has been dropped.
 		"""
-		with self('notify', **kwargs) as self:
-			return self.response
+		return self.emit('notify', **kwargs)
+
+	def emit(self, route, key=None, **kwargs):
+		"""
+		Fire-and-forget event, buffered and sent in batches by the channel
+		of the client. Events of the route with the same key are merged.
+
+		Args:
+		    `route`: Name of the action on service-side.
+		    `key`: Merges the repeated events, e.g. the session id.
+		    `kwargs`: A collection of any kind key/value pairs.
+		Returns:
+		    False if the event has been dropped.
+		"""
+		if self.channel:
+			return self.channel.emit(route, key, **kwargs)
+		with self(route, **kwargs) as tcp:
+			return tcp.ok
 
 	def expose(self, url):
 		"""
@@ -36,8 +52,7 @@ class Events(object):
 		Returns:
 		    None
 		"""
-		if not url in self._exposed:
-			self._exposed.append(url)
+		self._exposed.add(url)
 		with self('expose', **{'url': url}) as self:
 			return self.response
 
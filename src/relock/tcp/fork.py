@@ -0,0 +1,24 @@
+import os
+
+from threading import Lock
+
+from .retry import budget
+
+#: Id of the current process, kept up to date by the fork hook, so the
+#: clients can tell they have been inherited by a forked child (gunicorn
+#: --preload) without a system call on every request.
+pid = os.getpid()
+#: Serializes the rebuild of the clients in the child.
+lock = Lock()
+
+def child():
+	""" Runs in the child right after the fork. The locks shared by all the
+		clients may have been held by a parent thread which doesn't exist in
+		the child, so they are replaced.
+	"""
+	global pid, lock
+	pid, lock = os.getpid(), Lock()
+	budget.lock = Lock()
+
+if hasattr(os, 'register_at_fork'):
+	os.register_at_fork(after_in_child=child)
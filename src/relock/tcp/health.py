@@ -0,0 +1,66 @@
+import time
+import logging
+
+from threading import Lock
+
+class Breaker(object):
+	""" Circuit breaker of a cluster server. Failed calls eject the server
+		from the rotation without blocking the callers, the background
+		health checker lets it back in half-open after the cooldown, and
+		the first call decides whether it's healthy again.
+
+			healthy --failures--> ejected --probe--> half-open --ok--> healthy
+			                         ^-------------------failure------'
+	"""
+
+	#: Consecutive failures ejecting a healthy server.
+	threshold: int 	= 3
+	#: Seconds an ejected server waits for the next probe.
+	cooldown: float = 5.0
+
+	state: str 		= 'healthy'
+	failures: int 	= 0
+	ejected: float 	= 0.0
+
+	def __post_init__(self):
+		#: Per server, like the lock of the load statistics.
+		self.__breaker__ = Lock()
+		if (_ := getattr(super(), '__post_init__', None)) is not None:
+			_()
+
+	@property
+	def routable(self) -> bool:
+		return self.state != 'ejected'
+
+	@property
+	def due(self) -> bool:
+		""" The ejected server has cooled down and should be probed.
+		"""
+		return self.state == 'ejected' and time.monotonic() - self.ejected >= self.cooldown
+
+	def success(self):
+		with self.__breaker__:
+			if self.state != 'healthy':
+				logging.info('Server %s:%s is healthy again', self.host, self.port)
+			self.state, self.failures = 'healthy', 0
+
+	def failure(self):
+		with self.__breaker__:
+			self.failures += 1
+			if self.state == 'half-open' or self.failures >= self.threshold:
+				if self.state != 'ejected':
+					logging.warning('Server %s:%s is ejected after %s failures', self.host,
+																			   self.port,
+																			   self.failures)
+				self.state, self.ejected = 'ejected', time.monotonic()
+
+	def eject(self):
+		with self.__breaker__:
+			self.state, self.ejected = 'ejected', time.monotonic()
+
+	def recover(self):
+		""" The probe has passed, the next call is the trial.
+		"""
+		with self.__breaker__:
+			if self.state == 'ejected':
+				self.state = 'half-open'
@@ -0,0 +1,55 @@
+from collections import deque
+from threading import Lock
+
+from .retry import Budget, NEVER
+
+class Hedge(object):
+	""" Hedging policy for the latency critical routes. If the reply is
+		slower than the given percentile of the recent round trips of the
+		route, a duplicate request goes to another server and the first
+		reply wins. The hedges are capped to the `rate` of the calls, so a
+		slow cluster isn't flooded with duplicates.
+	"""
+
+	#: Round trips needed before the percentile is trusted.
+	samples: int = 20
+
+	def __init__(self, routes:set = None,
+					   percentile:float = 95.0,
+					   rate:float = 0.05,
+					   window:int = 1000):
+		if isinstance(routes, str):
+			routes = [route.strip() for route in routes.split(',') if route.strip()]
+		self.routes     = frozenset(routes or ()) - NEVER
+		self.percentile = float(percentile)
+		self.window     = int(window)
+		self.windows    = dict()
+		self.thresholds = dict()
+		self.budget     = Budget(rate, reserve=5.0)
+		self.lock       = Lock()
+
+	def __contains__(self, route:str) -> bool:
+		return route in self.routes
+
+	def __bool__(self) -> bool:
+		return bool(self.routes)
+
+	def record(self, route:str, elapsed:float):
+		""" Add the round trip to the window of the route, the threshold is
+			recomputed every few samples rather than on every call.
+		"""
+		with self.lock:
+			if (window := self.windows.get(route)) is None:
+				window = self.windows[route] = deque(maxlen=self.window)
+			window.append(elapsed)
+			if len(window) >= self.samples and len(window) % 10 == 0 or \
+			   route not in self.thresholds and len(window) == self.samples:
+				ordered = sorted(window)
+				self.thresholds[route] = ordered[min(int(len(ordered) * self.percentile / 100),
+													 len(ordered) - 1)]
+
+	def threshold(self, route:str) -> float:
+		""" Seconds to wait for the reply before hedging, None until there
+			are enough samples.
+		"""
+		return self.thresholds.get(route)
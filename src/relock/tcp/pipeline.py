@@ -0,0 +1,276 @@
+import time
+import zlib
+import socket
+import logging
+import itertools
+
+from typing import Any
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from ..thread import Thread
+from ..thread.backend import backend
+from .socket import Socket
+from .pool import Pool, Exhausted
+
+class Unsupported(ConnectionError):
+	""" The service hasn't confirmed the pipelining in its hello reply.
+	"""
+
+class Pipeline(Socket):
+	""" Connection carrying many requests at once. Every frame has a 4-byte
+		request id right after the length header, and the replies are 
+		delivered to the waiting callers by id, in whatever order the
+		relock service sends them back.
+	"""
+
+	pipeline:bool 	 = True
+
+	_rid:int 		 = 4
+
+	def __init__(self, host:str, 
+					   port:str, 
+					   lock:object = None,
+					   **kwargs):
+		#: Requests sent and still waiting for the reply, by request id.
+		self.pending = dict()
+		self.counter = itertools.count(1)
+		super().__init__(host, port, lock, **kwargs)
+		#: Only the reader thread receives, writes are serialised on the
+		#: connection lock.
+		self.reading = backend.Lock()
+		#: The reader waits for replies as long as the connection lives,
+		#: deadlines are enforced on the callers waiting for them.
+		self.request.settimeout(None)
+		self.receive()
+
+	def hello(self):
+		super().hello()
+		if not self.pipelined:
+			self.close()
+			raise Unsupported('Host %s:%s does not support pipelining.' % self.addr)
+
+	def __enter__(self):
+		#: The connection is shared by all callers, so it's never locked
+		#: for the time of a round trip.
+		if not self.connected:
+			raise ConnectionResetError('Host %s:%s has gone.' % self.addr)
+		elif self.stale and not bool(self):
+			self.close()
+			raise ConnectionResetError('Host %s:%s has gone.' % self.addr)
+		return self
+
+	def __exit__(self, *args):
+		pass
+
+	def __bool__(self) -> bool:
+		try:
+			return self.submit(b'PING').result(self.idle or None) == b'PONG'
+		except Exception as e:
+			logging.error(e)
+		return False
+
+	def close(self):
+		try:
+			#: Wakes up the reader thread blocked on the socket.
+			self.request.shutdown(socket.SHUT_RDWR)
+		except OSError:
+			pass
+		super().close()
+
+	@property
+	def load(self) -> int:
+		return len(self.pending)
+
+	def submit(self, _:bytes = bytes(), **kwargs) -> Future:
+		""" Send the request without waiting for the reply. The returned 
+			future is resolved by the reader thread once the reply with the 
+			same request id arrives.
+		"""
+		future = backend.Future()
+		self.dispatch(future, _, **kwargs)
+		return future
+
+	def dispatch(self, waiter:object, _:bytes = bytes(), **kwargs) -> int:
+		""" Register the waiter for the reply and send the request, returns
+			the request id. The waiter is a future for a single reply or a 
+			queue for the chunks of a stream.
+		"""
+		with self.writing:
+			id = next(self.counter) & 0xFFFFFFFF
+			self.pending[id] = waiter
+			try:
+				self.sendall(id.to_bytes(self._rid, byteorder='big'),
+							 self._encode(_, **kwargs))
+			except:
+				self.pending.pop(id, None)
+				raise
+		return id
+
+	def roundtrip(self, **kwargs) -> Any:
+		return self.submit(**kwargs).result()
+
+	def within(self, deadline:float = None, **kwargs) -> Any:
+		""" Wait for the reply until the deadline, a late reply is 
+			dropped by the reader thread.
+		"""
+		if deadline is None:
+			return self.roundtrip(**kwargs)
+		if (remaining := deadline - time.monotonic()) <= 0:
+			raise TimeoutError('Deadline of the call to %s:%s has passed.' % self.addr)
+		id = self.dispatch(future := backend.Future(), **kwargs)
+		try:
+			return future.result(remaining)
+		except FutureTimeout:
+			self.pending.pop(id, None)
+			raise TimeoutError('No reply from %s:%s within the deadline.' % self.addr)
+
+	def stream(self, **kwargs):
+		""" Streamed response on the shared connection, the chunks are 
+			queued by the reader thread until the empty chunk ends the 
+			stream. An abandoned stream only stops waiting for its id.
+		"""
+		if not self.streaming:
+			yield from super().stream(**kwargs)
+			return
+		id = self.dispatch(queue := backend.Queue(), **{**kwargs, 'stream': True})
+		try:
+			while _ := queue.get():
+				if isinstance(_, Exception):
+					raise _
+				yield from self._items(_)
+		finally:
+			self.pending.pop(id, None)
+
+	def recvframe(self) -> tuple:
+		""" Read the next frame as a (request id, body) tuple, the body 
+			is received straight into its own buffer. Returns None once the
+			peer has closed the connection.
+		"""
+		with self.reading:
+			if (header := self.recvheader()) is None:
+				return None
+			if (abs := header[0]) < self._rid:
+				raise ConnectionResetError('Malformed frame from %s:%s.' % self.addr)
+			if header[1]:
+				#: The compressed body covers the request id as well.
+				if (_ := self.recvinto(abs)) is None:
+					return None
+				_ = zlib.decompress(_)
+				id, _ = _[:self._rid], _[self._rid:]
+			elif (id := self.recvinto(self._rid)) is None or \
+				 (_ := self.recvinto(abs - self._rid)) is None:
+				return None
+			self.used = time.time()
+		return int.from_bytes(id, byteorder='big'), _
+
+	@Thread.daemon
+	def receive(self):
+		try:
+			while (frame := self.recvframe()) is not None:
+				id, _ = frame
+				if (waiter := self.pending.get(id)) is None:
+					logging.debug('Reply for unknown request %s from %s:%s', id, *self.addr)
+				elif isinstance(waiter, Future):
+					self.pending.pop(id, None)
+					waiter.set_result(self._decode(_))
+				else:
+					waiter.put(_ := self._decode(_))
+					if not _:
+						#: The empty chunk ends the stream.
+						self.pending.pop(id, None)
+		except Exception as e:
+			logging.debug('Pipeline to %s:%s closed, %s', *self.addr, e)
+		finally:
+			self.close()
+			#: Nobody is going to answer the requests still in flight.
+			while self.pending:
+				try:
+					id, waiter = self.pending.popitem()
+				except KeyError:
+					break
+				if isinstance(waiter, Future):
+					waiter.set_exception(ConnectionResetError('Host %s:%s has gone.' % self.addr))
+				else:
+					waiter.put(ConnectionResetError('Host %s:%s has gone.' % self.addr))
+
+class Multiplex(Pool):
+	""" Pool of pipelined connections. Connections aren't handed out
+		exclusively, every caller gets the least loaded one. If the service
+		doesn't confirm the pipelining, it turns into a plain pool.
+	"""
+
+	socket: type 	 = Pipeline
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		if self.pipelined:
+			self.available.clear()
+
+	@property
+	def pipelined(self) -> bool:
+		return self.socket is Pipeline
+
+	def __call__(self, host:str, port:int):
+		if self.pipelined:
+			try:
+				return super().__call__(host, port)
+			except Unsupported as e:
+				logging.warning('%s Plain connections are used instead.', e)
+				self.socket = Socket
+		return super().__call__(host, port)
+
+	def checkout(self, timeout:float = None) -> Pipeline:
+		if not self.pipelined:
+			return super().checkout(timeout)
+		if timeout is None:
+			timeout = self.acquire
+		with self.lock:
+			for conn in [conn for conn in self if conn.closed]:
+				super().remove(conn)
+			#: A burst of calls on an empty pool waits for the connections
+			#: being opened instead of opening more than the size.
+			if not self.lock.wait_for(lambda: len(self) or self.opening < self.size, timeout):
+				raise Exhausted('No connection to %s:%s within %ss.' % (self.host,
+																	   self.port,
+																	   timeout))
+			if len(self) and len(self) + self.opening >= self.size:
+				return min(self, key=lambda conn: conn.load)
+			self.opening += 1
+		try:
+			return self(self.host, self.port)
+		finally:
+			with self.lock:
+				self.opening -= 1
+				self.lock.notify_all()
+
+	def checkin(self, conn:Pipeline):
+		if not isinstance(conn, Pipeline):
+			return super().checkin(conn)
+		with self.lock:
+			if conn in self and self.retired and not conn.load:
+				conn.close()
+			if conn in self and conn.closed:
+				super().remove(conn)
+
+	def purge(self):
+		if not self.pipelined:
+			return super().purge()
+		for conn in list(self):
+			if not conn.load:
+				conn.close()
+			self.checkin(conn)
+
+	def keepalive(self):
+		if not self.pipelined:
+			return super().keepalive()
+		with self.lock:
+			stale = [conn for conn in self if conn.stale]
+		for conn in stale:
+			try:
+				with conn:
+					pass
+			except Exception as e:
+				logging.debug('Keepalive probe to %s:%s failed, %s', self.host, self.port, e)
+			finally:
+				self.checkin(conn)
+		return len(stale)
@@ -4,92 +4,257 @@ import sys
 import socket
 import signal
 
+from collections import deque
 from dataclasses import dataclass
-from contextlib import closing
+from contextlib import closing, contextmanager
 
 from .socket import Socket
+from ..thread.backend import backend
+
+class Exhausted(TimeoutError):
+	""" No connection has been returned to the pool within the acquire
+		timeout. The server is alive, it's only the pool that is busy.
+	"""
 
 class Pool(list):
 
+	socket: type 	 = Socket
+
 	length: int  	 = 2048
 	ping: bool  	 = False
 	size: int 		 = 1
 	host: str   	 = str()
 	port: int   	 = 0
 	expire: int 	 = 60
+	acquire: float 	 = 5.0
+	idle: float 	 = 30.0
+	codecs: list 	 = None
+	compress: int 	 = 0
+	timeout: float 	 = None
+	connect: float 	 = None
+	retired: bool 	 = False
 
-	__id__: int 	 = 0
 	__cn__: int 	 = 1
 
-	def __init__(self, host:str    = str(), 
-					   port:int    = int(), 
-					   pool:int    = 1, 
-					   ping:bool   = False,
-					   lock:object = None,
-					   expire:int  = 600):
-		Pool.host   = host
-		Pool.port   = port
-		Pool.pool   = pool
-		Pool.ping   = ping
-		Pool.lock   = lock
-		Pool.expire = expire
-		for x in range(pool):
-			self(host, port)
+	def __init__(self, host:str      = str(),
+					   port:int      = int(),
+					   pool:int      = 1,
+					   ping:bool     = False,
+					   expire:int    = 600,
+					   acquire:float = 5.0,
+					   idle:float    = 30.0,
+					   codecs:list   = None,
+					   compress:int  = 0,
+					   timeout:float = None,
+					   connect:float = None,
+					   warm:int      = None):
+		self.host    = host
+		self.port    = port
+		self.size    = int(pool)
+		self.ping    = ping
+		self.expire  = expire
+		self.acquire = acquire
+		self.idle    = idle
+		self.codecs  = codecs
+		self.compress = compress
+		self.timeout = timeout
+		self.connect = connect
+		self.__cn__  = 1
+		self.opening = 0
+		#: Guards the bookkeeping of the pool and wakes up threads waiting
+		#: for an idle connection.
+		self.lock    = backend.Condition()
+		#: Connections ready to be checked out, every socket in the pool
+		#: is either here or exclusively owned by a single caller.
+		self.available = deque()
+		#: Connections checked out by the current thread, released in
+		#: reverse order on context exit.
+		self.local   = backend.local()
+		#: Connections opened right away, the rest are opened by `fill()`
+		#: or on demand.
+		for x in range(self.size if warm is None else min(warm, self.size)):
+			self.available.append(self(host, port))
 
 	def __enter__(self):
-		with next(self) as conn:
+		if (conn := self.checkout()) is not None:
+			try:
+				conn = conn.__enter__()
+			except:
+				self.checkin(conn)
+				raise
+			if not hasattr(self.local, 'conns'):
+				self.local.conns = list()
+			self.local.conns.append(conn)
 			return conn
-		raise ConnectionRefusedError('Connection has been lost. %s:%s:%s', self.__id__, len(self), self[0])
+		raise ConnectionRefusedError('Connection has been lost. %s:%s' % (self.host, self.port))
 
 	def __exit__(self, *args):
-		pass
+		if getattr(self.local, 'conns', None):
+			if (conn := self.local.conns.pop()) is not None:
+				try:
+					conn.__exit__(*args)
+				finally:
+					self.checkin(conn)
 
 	def __call__(self, host:str, port:int):
-		if id := self.__cn__ + 1:
-			self.__cn__ = id
-			if conn := Socket(host, port, 
+		with self.lock:
+			self.__cn__ = id = self.__cn__ + 1
+		if (conn := self.socket(host, port,
 									expire=self.expire,
-									lock=self.lock,
-								    id=id):
+									idle=self.idle,
+									codecs=self.codecs,
+									compress=self.compress,
+									timeout=self.timeout,
+									connect=self.connect,
+									id=id)) is not None:
+			with self.lock:
 				self.append(conn)
-			# with self[-1] as conn:
-		return self[-1]
+		return conn
 
 	def __iter__(self):
 		for i in range(len(self)):
 			yield self[i]
 
-	def __next__(self):
-		if self.__id__ == len(self):
-			self.__id__ = 0
-		self.__id__ = self.__id__ + 1
-		if conn := self[self.__id__ - 1]:
-			if time.time() > conn.expire and conn.closed:
-				if hash(conn):
-					return next(self.restore(conn))
-				else:
-					raise ConnectionRefusedError('Connection has been lost. %s:%s:%s', self.__id__, len(self), self[0])
-			elif not conn.closed:
-				conn.expire = time.time() + self.expire
-			return conn
-		if len(self) < self.pool:
-			if conn := self(self.host, self.port):
-				return next(self)
-		raise ConnectionRefusedError('Connection has been lost. %s:%s:%s', self.__id__, len(self), self[0])
-
 	def __bool__(self):
 		return True if len(self) else False
 
+	@contextmanager
+	def connection(self, timeout:float = None):
+		""" Exclusive connection for the time of the context, not bound to 
+			the calling thread, so it can be held by a generator.
+		"""
+		conn = self.checkout(timeout)
+		try:
+			with conn:
+				yield conn
+		finally:
+			self.checkin(conn)
+
+	def fill(self) -> int:
+		""" Open the missing connections up to the pool size in advance, 
+			so a failover doesn't pay the connect latency on the request
+			path. Returns the number of connections opened.
+		"""
+		opened = 0
+		while True:
+			with self.lock:
+				for conn in [conn for conn in self if conn.closed]:
+					if conn in self.available:
+						self.available.remove(conn)
+					super().remove(conn)
+				if len(self) + self.opening >= self.size:
+					return opened
+				self.opening += 1
+			try:
+				self.checkin(self(self.host, self.port))
+				opened += 1
+			finally:
+				with self.lock:
+					self.opening -= 1
+					self.lock.notify()
+
+	def checkout(self, timeout:float = None) -> Socket:
+		""" Take an idle connection out of the pool for exclusive use. If
+			every connection is busy and the pool is full, the caller waits
+			up to `timeout` seconds for one to be returned.
+		"""
+		if timeout is None:
+			timeout = self.acquire
+		with self.lock:
+			if not self.lock.wait_for(lambda: self.available or len(self) + self.opening < self.size,
+									  timeout):
+				raise Exhausted('No idle connection to %s:%s within %ss.' % (self.host,
+																			 self.port,
+																			 timeout))
+			if self.available:
+				conn = self.available.pop()
+			else:
+				conn, self.opening = None, self.opening + 1
+		if conn is None:
+			try:
+				return self(self.host, self.port)
+			finally:
+				with self.lock:
+					self.opening -= 1
+					self.lock.notify()
+		if conn.closed:
+			return self.restore(conn)
+		conn.expire = time.time() + self.expire
+		return conn
+
+	def checkin(self, conn:Socket):
+		""" Return the connection to the pool. Connections that have been
+			closed in the meantime are dropped and lazily replaced on the
+			next checkout.
+		"""
+		with self.lock:
+			if conn in self:
+				if self.retired and not conn.closed:
+					conn.close()
+				if conn.closed:
+					super().remove(conn)
+				elif not conn in self.available:
+					self.available.append(conn)
+			self.lock.notify()
+
+	def retire(self):
+		""" The server has left the cluster. Idle connections are closed
+			right away, the ones still used by requests in flight once they
+			are returned.
+		"""
+		self.retired = True
+		self.purge()
+
+	def purge(self):
+		""" Close the idle connections. Once a connection has been reset
+			by the server, the idle ones are most likely dead as well, and
+			the next checkout should rather open a fresh one.
+		"""
+		with self.lock:
+			idle, self.available = list(self.available), deque()
+		for conn in idle:
+			conn.close()
+			self.checkin(conn)
+
+	def abandon(self):
+		""" The process has been forked, close the inherited descriptors
+			without touching the connections of the parent. The pool isn't 
+			used afterwards, so its lock, which may have been held by a 
+			parent thread, is left alone.
+		"""
+		for conn in list(self):
+			conn.abandon()
+
+	def keepalive(self):
+		""" Probe the idle connections which haven't been used for longer
+			than the idle threshold. Checking the connections out keeps them
+			away from callers for the time of the probe, dead ones are
+			dropped and replaced lazily on the next checkout.
+		"""
+		with self.lock:
+			stale = [conn for conn in self.available if conn.stale]
+			for conn in stale:
+				self.available.remove(conn)
+		for conn in stale:
+			try:
+				with conn:
+					pass
+			except Exception as e:
+				logging.debug('Keepalive probe to %s:%s failed, %s', self.host, self.port, e)
+			finally:
+				self.checkin(conn)
+		return len(stale)
+
 	def shutdown(self, conn):
-		if conn in self:
-			conn.shutdown(2)
-			super().remove(conn)
-		self.__cn__ = self.__cn__ - 1
-		del conn
+		with self.lock:
+			if conn in self.available:
+				self.available.remove(conn)
+			if conn in self:
+				super().remove(conn)
+			self.lock.notify()
+		conn.shutdown(2)
 		return self
 
 	def restore(self, conn):
-		if self(*conn.addr):
-			self.shutdown(conn)
-		return self
-
+		self.shutdown(conn)
+		return self(*conn.addr)
@@ -0,0 +1,30 @@
+from typing import Any
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class Result:
+	""" Outcome of a single call to the relock service. Every call gets
+		its own result, so callers sharing the client never see each
+		other's replies. It's a context manager to keep the existing
+		`with tcp(...) as tcp:` call sites working.
+	"""
+
+	route: str
+	response: Any 	 = None
+	#: ok - the service replied, busy - no pooled connection within the
+	#: acquire timeout, down - no server could be reached, timeout - the
+	#: deadline has passed, error - the call failed in an unexpected way.
+	status: str 	 = 'down'
+	#: Wall time of the call in seconds, retries included.
+	elapsed: float 	 = 0.0
+	server: tuple 	 = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		pass
+
+	@property
+	def ok(self) -> bool:
+		return self.status == 'ok'
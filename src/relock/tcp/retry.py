@@ -0,0 +1,39 @@
+from threading import Lock
+
+#: Routes which can be replayed safely once the request may have reached
+#: the server. Everything else, the key `exchange` above all, is sent at
+#: most once.
+IDEMPOTENT = frozenset(('get', 'exists', 'keys', 'ttl', 'zrange', 'zrevrange',
+						'smembers', 'members', 'devices', 'js', 'protected',
+						'set', 'delete', 'expire', 'zadd', 'zrem', 'sadd',
+						'srem', 'expose'))
+
+#: Routes which are never replayed, whatever the configuration says.
+NEVER = frozenset(('exchange', 'batch'))
+
+class Budget(object):
+	""" Process-wide retry budget. Every call deposits `ratio` of a token
+		and every retry withdraws a whole one, so retries stay within the
+		ratio of the traffic and can't snowball when the cluster is in
+		trouble. The reserve lets a quiet process retry too.
+	"""
+
+	def __init__(self, ratio:float = 0.1, reserve:float = 10.0):
+		self.ratio   = float(ratio)
+		self.reserve = float(reserve)
+		self.tokens  = float(reserve)
+		self.lock    = Lock()
+
+	def deposit(self):
+		with self.lock:
+			self.tokens = min(self.tokens + self.ratio, self.reserve)
+
+	def withdraw(self) -> bool:
+		with self.lock:
+			if self.tokens >= 1.0:
+				self.tokens -= 1.0
+				return True
+		return False
+
+#: Shared by all clients of the process unless one is given its own.
+budget = Budget()
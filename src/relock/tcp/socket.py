@@ -3,20 +3,59 @@ import logging
 import sys
 import socket
 import signal
+import zlib
 
 from ctypes import c_ulong
 from fcntl import ioctl
 
+from typing import Any
+
 from .base import Base
+from .codec import available, negotiate
+
+from ..thread.backend import backend
+
+#: Prefix of the servers listening on a unix domain socket, co-located
+#: with the application, e.g. unix:///run/relock/relock.sock
+UNIX = 'unix://'
 
-from gevent import sleep
+def address(host:str, port:int = 0, schema:str = 'tcp') -> tuple:
+	""" The (host, port) of a server as used in the cluster. A unix domain
+		socket is the 'unix://' path with no port, a bare path is taken as
+		one if the schema is 'unix'.
+	"""
+	if schema == 'unix' and not str(host).startswith(UNIX):
+		host = UNIX + str(host)
+	if str(host).startswith(UNIX):
+		return host, 0
+	return host, int(port)
+
+def endpoint(host:str, port:int) -> tuple:
+	""" Socket family and the address to connect to.
+	"""
+	if str(host).startswith(UNIX):
+		return socket.AF_UNIX, str(host)[len(UNIX):]
+	return socket.AF_INET, (host, port)
 
 class Socket(Base):
 
 	length:int  	 = 2048
 	connected:bool 	 = False
+	idle:float 		 = 30.0
+	pipeline:bool 	 = False
+	pipelined:bool 	 = False
+	compression:str  = None
+	threshold:int 	 = 0
+	streaming:bool 	 = False
+	timeout:float 	 = None
+	connect:float 	 = None
 	
 	_bytes:int 		 = 3
+	_extended:int 	 = 8
+	_zlib:int 		 = 0x800000
+	#: Frames below this size are joined and sent at once, a copy of a
+	#: small frame is cheaper than the scatter/gather bookkeeping.
+	_gather:int 	 = 0x10000
 
 	def __init__(self, host:str, 
 					   port:str, 
@@ -26,13 +65,38 @@ class Socket(Base):
 		self.__id__		  = kwargs.get('id', 0)
 		self.__response	  = None
 		self.addr         = (host, port)
-		self.lock         = lock
+		#: Every connection owns its lock, so a pool of N sockets can keep
+		#: N requests in flight at the same time.
+		self.lock         = lock or backend.RLock()
+		self.reading      = self.lock
+		self.writing      = self.lock
 		self.expire		  = time.time() + kwargs.get('expire', 600)
+		#: Liveness is tracked passively, the connection is probed with
+		#: PING only if it has been idle longer than the threshold.
+		self.idle         = float(kwargs.get('idle', self.idle))
+		self.used         = time.time()
 		self.connected    = False
+		#: Codecs announced to the service at connect time, JSON is used
+		#: until the service picks one of them.
+		self.codecs       = available(kwargs.get('codecs'))
+		#: Frames larger than the threshold are compressed, if the service
+		#: agrees to it. Zero turns the compression off.
+		self.threshold    = int(kwargs.get('compress', self.threshold) or 0)
+		self.compression  = None
+		self.streaming    = False
+		#: Seconds to wait for the connection and for every send or 
+		#: receive afterwards, None waits forever.
+		self.connect      = kwargs.get('connect', self.connect)
+		self.timeout      = kwargs.get('timeout', self.timeout)
 
-		self.request = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-		self.request.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-		self.request.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+		#: TCP, or a unix domain socket skipping the loopback stack if the
+		#: server runs on the same machine.
+		self.family, self.endpoint = endpoint(host, port)
+		self.request = backend.socket.socket(self.family, socket.SOCK_STREAM)
+		if self.family == socket.AF_INET:
+			self.request.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+			self.request.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+			self.request.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
 		# self.request.setblocking(0)
 		abs(self)
 
@@ -41,29 +105,83 @@ class Socket(Base):
 			self.__response = self._get()
 		return self
 
+	def roundtrip(self, **kwargs) -> Any:
+		""" Send the request and wait for the reply, the connection
+			must be exclusively checked out by the caller.
+		"""
+		if self._put(**kwargs):
+			return self._get()
+		raise ConnectionResetError('Host %s:%s has gone.' % self.addr)
+
+	def within(self, deadline:float = None, **kwargs) -> Any:
+		""" Round trip bounded by the deadline, a `time.monotonic()` value.
+			A timed out connection is closed, as the rest of the reply may
+			still be on the wire.
+		"""
+		if deadline is None:
+			return self.roundtrip(**kwargs)
+		if (remaining := deadline - time.monotonic()) <= 0:
+			raise TimeoutError('Deadline of the call to %s:%s has passed.' % self.addr)
+		self.request.settimeout(remaining)
+		try:
+			return self.roundtrip(**kwargs)
+		finally:
+			if not self.closed:
+				self.request.settimeout(self.timeout)
+
+	def stream(self, **kwargs):
+		""" Send the request in the streaming mode and yield the items of
+			the response chunk by chunk, so only one chunk is kept in the 
+			memory at a time. The stream ends with an empty chunk. If the 
+			service doesn't stream, the whole response is a single chunk.
+
+			The connection must be exclusively checked out by the caller.
+			If the stream is abandoned before its end, the connection is
+			closed, as the rest of the chunks are still on the wire.
+		"""
+		if not self.streaming:
+			yield from self._items(self.roundtrip(**kwargs))
+			return
+		if not self._put(**{**kwargs, 'stream': True}):
+			raise ConnectionResetError('Host %s:%s has gone.' % self.addr)
+		finished = False
+		try:
+			while True:
+				if not (_ := self.recvall()):
+					raise ConnectionResetError('Host %s:%s has gone.' % self.addr)
+				if not (_ := self._decode(_)):
+					break
+				yield from self._items(_)
+			finished = True
+		finally:
+			if not finished:
+				self.close()
+
 	def __enter__(self):
-		if not bool(self):
-			return abs(self)
+		#: The lock is held for the whole request/reply round trip, so no
+		#: other thread can interleave its frames on this connection.
+		self.lock.acquire()
+		try:
+			if not self.connected:
+				abs(self)
+			elif self.stale and not bool(self):
+				raise ConnectionResetError('Host %s:%s has gone.' % self.addr)
+		except:
+			self.close()
+			self.lock.release()
+			raise
 		return self
 
 	def __exit__(self, *args):
 		self.__response = None
-
-	def __hash__(self, _:int = 0):
-		try:
-			with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as sock:
-				if sock.connect_ex(self.addr) == 0:
-					_ = 1
-		except Exception as e:
-			logging.info('socket pre-check - The TCP host is no longer operational.')
-		else:
-			logging.info('pre-check of server - The TCP connection has been checked and it is valid.')
-		return _
+		self.lock.release()
 
 	def __abs__(self, _:bytes = bytes()):
 		if not self.connected:
 			try:
-				self.request.connect(self.addr)
+				self.request.settimeout(self.connect)
+				self.request.connect(self.endpoint)
+				self.request.settimeout(self.timeout)
 			except ConnectionRefusedError:
 				logging.debug('Connection Refused %s:%s, host is down.', *self.addr)
 				raise ConnectionRefusedError('Host %s:%s is down.' % self.addr)
@@ -74,8 +192,34 @@ class Socket(Base):
 				raise ConnectionRefusedError('Host %s:%s is down.' % self.addr)
 			else:
 				self.connected = True
+				self.hello()
 		return self
 
+	def hello(self):
+		""" Announce the codecs, the compression and the streaming 
+			supported by this client, it's the first frame on the connection
+			and it's never pipelined. A service which doesn't understand it
+			is talked to in plain JSON.
+		"""
+		reply = Socket.roundtrip(self, **{'route': 'hello',
+										  'codecs': self.codecs,
+										  'compression': ['zlib'] if self.threshold else [],
+										  'stream': True,
+										  'pipeline': self.pipeline})
+		self.codec = negotiate(reply)
+		if isinstance(reply, dict):
+			if self.threshold and reply.get('compression') == 'zlib':
+				#: From now on the top bit of the length header marks 
+				#: compressed frames.
+				self.compression = 'zlib'
+			#: The service sends list responses in chunks when asked to.
+			self.streaming = bool(reply.get('stream'))
+			#: Frames carry the request id only if the service agrees.
+			self.pipelined = bool(self.pipeline and reply.get('pipeline'))
+		logging.debug('Codec %s, compression %s negotiated with %s:%s', self.codec.name, 
+																		  self.compression,
+																		  *self.addr)
+
 	def __bool__(self, _:bool = False, bytes:bytes = bytes()) -> bool:
 		try:
 			if int := self.sendall(b'PING'):
@@ -127,6 +271,10 @@ class Socket(Base):
 	def closed(self):
 		return self.request._closed
 
+	@property
+	def stale(self) -> bool:
+		return bool(self.idle) and time.time() - self.used > self.idle
+
 	def recv(self):
 		return self.request.recv(self.length)
 
@@ -134,25 +282,115 @@ class Socket(Base):
 		if not self.request._closed:
 			return self.request.send(value)
 
-	def sendall(self, _:bytes = bytes(), abs:bytes = bytes()):
-		with self.lock:
-			if abs := len(_).to_bytes(self._bytes, byteorder='big'):
-				self.request.sendall(abs + _)
-				# print('snd:', abs, len(abs), len(_), _)
-			sleep(0)
-		return int.from_bytes(abs, 'big')
-
-	def recvall(self, *flags, _:bytes = bytes()):
-		with self.lock:
-			if abs := self.request.recv(self._bytes, *flags):
-				# print('rcv:', abs, len(abs))
-				if abs := int.from_bytes(abs, byteorder="big"):
-					while slice := self.request.recv(self.length, *flags):
-						_ += slice
-						if len(_) >= abs:
-							break
+	def sendall(self, *_:bytes) -> int:
+		with self.writing:
+			try:
+				if abs := sum(map(len, _)):
+					size, compressed = abs, False
+					if self.compression and abs > self.threshold:
+						#: Only worth sending if it actually got smaller.
+						if compressed := len(packed := self.compress(*_)) < abs:
+							_, size = (packed,), len(packed)
+					if size < self._gather:
+						self.request.sendall(b''.join((self.header(size, compressed), *_)))
+					else:
+						#: Scatter/gather write, the header and the body parts are 
+						#: never concatenated into a new bytes object.
+						self.sendmsg(self.header(size, compressed), *_)
+			except OSError:
+				#: A failed write means the peer is gone, the connection is
+				#: marked dead and dropped when returned to the pool.
+				self.close()
+				raise
+			else:
+				self.used = time.time()
+			backend.cooperate()
+		return abs
+
+	@property
+	def mask(self) -> int:
+		""" The largest value of the length field, used as the escape for
+			the extended length following the header.
+		"""
+		if self.compression:
+			return self._zlib - 1
+		return (1 << 8 * self._bytes) - 1
+
+	def header(self, abs:int, compressed:bool = False) -> bytes:
+		flag = self._zlib if compressed else 0
+		if abs >= self.mask:
+			#: Frames which don't fit the 3-byte length carry the real 
+			#: length in the extended field right after the header.
+			return (self.mask | flag).to_bytes(self._bytes, byteorder='big') + \
+				   abs.to_bytes(self._extended, byteorder='big')
+		return (abs | flag).to_bytes(self._bytes, byteorder='big')
+
+	def recvheader(self, *flags) -> tuple:
+		""" Read the frame header, returns the (length, compressed) tuple,
+			or None if the peer has closed the connection.
+		"""
+		if (abs := self.recvinto(self._bytes, *flags)) is None:
+			return None
+		abs, compressed = int.from_bytes(abs, byteorder='big'), False
+		if self.compression:
+			abs, compressed = abs & ~self._zlib, bool(abs & self._zlib)
+		if abs == self.mask:
+			if (abs := self.recvinto(self._extended, *flags)) is None:
+				return None
+			abs = int.from_bytes(abs, byteorder='big')
+		return abs, compressed
+
+	def compress(self, *_:bytes) -> bytes:
+		compressor = zlib.compressobj()
+		return b''.join([compressor.compress(part) for part in _] + [compressor.flush()])
+
+	def sendmsg(self, *buffers:bytes):
+		buffers = [memoryview(buffer).cast('B') for buffer in buffers]
+		while buffers:
+			if sent := self.request.sendmsg(buffers):
+				while buffers and sent >= len(buffers[0]):
+					sent -= len(buffers.pop(0))
+				if sent:
+					buffers[0] = buffers[0][sent:]
+
+	def recvall(self, *flags) -> bytearray:
+		with self.reading:
+			try:
+				if (header := self.recvheader(*flags)) is not None:
+					if (abs := header[0]):
+						if (_ := self.recvinto(abs, *flags)) is None:
+							raise ConnectionResetError('Host %s:%s closed the connection.' % self.addr)
+						if header[1]:
+							_ = zlib.decompress(_)
+					else:
+						_ = bytearray()
+				else:
+					#: Zero bytes read, the peer has closed the connection.
+					self.close()
+					_ = bytearray()
+			except OSError:
+				self.close()
+				raise
+			else:
+				self.used = time.time()
 			# print('rcv:', _)
-			sleep(0)
+			backend.cooperate()
+		return _
+
+	def recvinto(self, size:int, *flags) -> bytearray:
+		""" Read exactly `size` bytes into a preallocated buffer, without
+			reading past the end of the frame. Returns None if the peer 
+			closes the connection before the buffer is filled.
+		"""
+		if (received := self.request.recv_into(_ := bytearray(size), size, *flags)) == size:
+			return _
+		elif not received:
+			return None
+		view = memoryview(_)[received:]
+		while view:
+			if not (received := self.request.recv_into(view, len(view), *flags)):
+				return None
+			view = view[received:]
 		return _
 
 	def shutdown(self, how=0):
@@ -174,8 +412,21 @@ class Socket(Base):
 		except Exception as e:
 			logging.debug(e)
 		finally:
+			self.connected = False
 			self.disconnected()
 
+	def abandon(self):
+		""" Drop the connection inherited from the parent process. Only the
+			descriptor of this process is closed, without a shutdown, as the
+			parent keeps using the connection.
+		"""
+		try:
+			self.request.close()
+		except OSError:
+			pass
+		finally:
+			self.connected = False
+
 	def disconnected(self):
 		if hasattr(self, 'addr'):
 			logging.debug('Client disconnected from server %s:%s', *self.addr)
@@ -1,31 +1,31 @@
 import time
 import logging
-import threading
 
 from functools import wraps
 
+from .backend import backend
+
 class Thread(object):
+	""" Runs the function in the background, in a thread or a greenlet
+		depending on the concurrency backend.
+	"""
 
 	@classmethod
 	def daemon(cls, function):
+		""" Own thread for the long lived loops, the keepalive, health checks
+			and receivers, which would hold a worker of the pool forever.
+		"""
 		@wraps(function)
 		def daemon(*args, **kwargs):
-			if _ := threading.Thread(target=function, 
-									 name=function.__name__, 
-									 args=args, 
-									 kwargs=kwargs, 
-									 daemon=True):
-				_.start()
+			return backend.spawn(function, args, kwargs)
 		return daemon
 
 	@classmethod
 	def thread(cls, function):
+		""" Kept for compatibility, a thread joined right away is the call
+			itself without the cost of the thread.
+		"""
 		@wraps(function)
 		def thread(*args, **kwargs):
-			if _ := threading.Thread(target=function, 
-									 name=function.__name__, 
-									 args=args,
-									 kwargs=kwargs):
-				_.start()
-				return _.join()
-		return thread
\ No newline at end of file
+			return function(*args, **kwargs)
+		return thread
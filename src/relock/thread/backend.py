@@ -0,0 +1,202 @@
+import time
+import queue
+import socket
+import logging
+import threading
+
+from collections import deque
+from concurrent import futures
+
+try:
+	import gevent
+	import gevent.lock
+	import gevent.pool
+	import gevent.local
+	import gevent.queue
+	import gevent.event
+	import gevent.socket
+	import gevent.monkey
+except ImportError:
+	gevent = None
+
+class Threads(object):
+	""" Native threads, the default. The yield points cost nothing, the
+		operating system switches the threads on its own.
+	"""
+
+	name: str = 'threads'
+
+	Lock 	  = staticmethod(threading.Lock)
+	RLock 	  = staticmethod(threading.RLock)
+	Condition = staticmethod(threading.Condition)
+	Semaphore = staticmethod(threading.BoundedSemaphore)
+	Queue 	  = staticmethod(queue.Queue)
+	Future 	  = staticmethod(futures.Future)
+	local 	  = staticmethod(threading.local)
+	sleep 	  = staticmethod(time.sleep)
+	socket 	  = socket
+
+	@staticmethod
+	def cooperate():
+		pass
+
+	@staticmethod
+	def spawn(function, args:tuple = (), kwargs:dict = None, daemon:bool = True):
+		if _ := threading.Thread(target=function,
+								 name=function.__name__,
+								 args=args,
+								 kwargs=kwargs,
+								 daemon=daemon):
+			_.start()
+		return _
+
+	@staticmethod
+	def Executor(workers:int, name:str = 'relock'):
+		return futures.ThreadPoolExecutor(workers, thread_name_prefix=name)
+
+class Condition(object):
+	""" Condition variable blocking only the waiting greenlet, threading's
+		one waits on a native lock and stalls the whole hub unless the
+		process is monkey-patched.
+	"""
+
+	def __init__(self, lock:object = None):
+		self.lock    = lock or gevent.lock.RLock()
+		self.waiters = deque()
+
+	def __enter__(self):
+		return self.lock.__enter__()
+
+	def __exit__(self, *args):
+		return self.lock.__exit__(*args)
+
+	def acquire(self, *args, **kwargs) -> bool:
+		return self.lock.acquire(*args, **kwargs)
+
+	def release(self):
+		self.lock.release()
+
+	def wait(self, timeout:float = None) -> bool:
+		self.waiters.append(waiter := gevent.event.Event())
+		state = self.lock._release_save()
+		try:
+			return waiter.wait(timeout)
+		finally:
+			self.lock._acquire_restore(state)
+			if waiter in self.waiters:
+				self.waiters.remove(waiter)
+
+	def wait_for(self, predicate, timeout:float = None) -> bool:
+		deadline = time.monotonic() + timeout if timeout is not None else None
+		while not (result := predicate()):
+			if deadline is not None:
+				if (timeout := deadline - time.monotonic()) <= 0:
+					break
+			self.wait(timeout)
+		return result
+
+	def notify(self, n:int = 1):
+		for _ in range(min(n, len(self.waiters))):
+			self.waiters.popleft().set()
+
+	def notify_all(self):
+		self.notify(len(self.waiters))
+
+class Future(futures.Future):
+	""" Future whose waiters are greenlets.
+	"""
+
+	def __init__(self):
+		super().__init__()
+		self._condition = Condition()
+
+class Executor(futures.Executor):
+	""" Runs the calls in greenlets, as many as `workers` at a time.
+	"""
+
+	def __init__(self, workers:int, name:str = 'relock'):
+		self.pool = gevent.pool.Pool(workers)
+
+	def submit(self, function, /, *args, **kwargs) -> Future:
+		future = Future()
+		def run():
+			if future.set_running_or_notify_cancel():
+				try:
+					future.set_result(function(*args, **kwargs))
+				except BaseException as e:
+					future.set_exception(e)
+		self.pool.spawn(run)
+		return future
+
+	def shutdown(self, wait:bool = True, **kwargs):
+		if wait:
+			self.pool.join()
+
+class Gevent(Threads):
+	""" Greenlets. The primitives block only the calling greenlet, the
+		sockets are cooperative and every send and receive is a yield
+		point, so a long run of requests can't starve the others.
+	"""
+
+	name: str = 'gevent'
+
+	if gevent is not None:
+		Lock 	  = staticmethod(lambda: gevent.lock.Semaphore(1))
+		RLock 	  = staticmethod(gevent.lock.RLock)
+		Condition = staticmethod(Condition)
+		Semaphore = staticmethod(gevent.lock.BoundedSemaphore)
+		Queue 	  = staticmethod(gevent.queue.Queue)
+		Future 	  = staticmethod(Future)
+		local 	  = staticmethod(gevent.local.local)
+		sleep 	  = staticmethod(gevent.sleep)
+		socket 	  = gevent.socket
+		Executor  = staticmethod(Executor)
+
+	@staticmethod
+	def cooperate():
+		gevent.sleep(0)
+
+	@staticmethod
+	def spawn(function, args:tuple = (), kwargs:dict = None, daemon:bool = True):
+		return gevent.spawn(function, *args, **(kwargs or {}))
+
+#: Backends available in this process.
+backends = {Threads.name: Threads}
+if gevent is not None:
+	backends[Gevent.name] = Gevent
+
+def patched() -> bool:
+	""" The process has been monkey-patched by gevent.
+	"""
+	return gevent is not None and gevent.monkey.is_module_patched('socket')
+
+class Backend(object):
+	""" Concurrency backend of the process, supplying the locks, queues,
+		sockets and yield points of the client. The primitives are looked
+		up when the objects are created, so the backend is picked before
+		the client is built and applies to every client of the process.
+	"""
+
+	name: str = None
+
+	def __init__(self, name:str = 'auto'):
+		self.use(name)
+
+	def use(self, name:str = 'auto'):
+		""" Switch to 'threads', 'gevent', or 'auto' for gevent if the
+			process is monkey-patched and threads otherwise.
+		"""
+		if not name or name == 'auto':
+			name = Gevent.name if patched() else Threads.name
+		if name not in backends:
+			raise ValueError('Concurrency backend %s is not available, use one of %s.' % (name,
+																						   ', '.join(backends)))
+		if name != self.name:
+			for key in dir(implementation := backends[name]):
+				if not key.startswith('_'):
+					setattr(self, key, getattr(implementation, key))
+			logging.debug('Concurrency backend %s', name)
+		return self
+
+#: Shared by the whole process.
+backend = Backend()
@@ -0,0 +1,123 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+
+from .backend import backend
+
+class Workers(object):
+	""" Bounded pool for the fire-and-forget calls, a few long lived workers
+		draining a queue instead of a new thread for every call. When the
+		queue is full the `overflow` policy decides: 'drop' the call, 'block'
+		the caller until there is room, or run it 'inline' in the caller.
+	"""
+
+	policies: tuple = ('drop', 'block', 'inline')
+
+	def __init__(self, workers:int = 4,
+					   backlog:int = 1024,
+					   overflow:str = 'drop'):
+		self.workers  = 0
+		self.backlog  = 0
+		self.overflow = None
+		self.queue    = None
+		self.pid      = None
+		self.dropped  = 0
+		self.inlined  = 0
+		self.lock     = threading.Lock()
+		self.configure(workers, backlog, overflow)
+
+	def configure(self, workers:int = None,
+						backlog:int = None,
+						overflow:str = None):
+		""" Resize the pool, the running workers finish the queued calls and
+			a new pool starts with the next call.
+		"""
+		if overflow is not None and overflow not in self.policies:
+			raise ValueError('Overflow policy %s is not one of %s.' % (overflow,
+																	   ', '.join(self.policies)))
+		with self.lock:
+			if (_ := (max(int(workers or self.workers), 1),
+					  max(int(backlog or self.backlog), 1),
+					  overflow or self.overflow)) != (self.workers, self.backlog, self.overflow):
+				if self.pid == os.getpid():
+					self.stop()
+				self.workers, self.backlog, self.overflow = _
+		return self
+
+	def start(self) -> object:
+		""" Queue and workers are created on the first call, so they are made
+			by the concurrency backend picked by the client, and again in a
+			forked child which doesn't inherit the threads.
+		"""
+		with self.lock:
+			if self.pid != os.getpid():
+				self.queue = backend.Queue(self.backlog)
+				for _ in range(self.workers):
+					backend.spawn(self.work, (self.queue,))
+				self.pid = os.getpid()
+		return self.queue
+
+	def stop(self):
+		""" Ask the workers of the current queue to leave once it's drained.
+		"""
+		if (_ := self.queue) is not None:
+			for worker in range(self.workers):
+				try:
+					_.put_nowait(None)
+				except queue.Full:
+					_.put(None)
+		self.queue, self.pid = None, None
+
+	def work(self, tasks:object):
+		while (task := tasks.get()) is not None:
+			function, args, kwargs = task
+			try:
+				function(*args, **kwargs)
+			except Exception as e:
+				logging.error('Background call %s failed, %s', function.__name__, e)
+			finally:
+				tasks.task_done()
+		tasks.task_done()
+
+	def submit(self, function, /, *args, **kwargs) -> bool:
+		""" Queue the call, False if it has been dropped.
+		"""
+		if self.pid != os.getpid() or (tasks := self.queue) is None:
+			tasks = self.start()
+		try:
+			tasks.put((function, args, kwargs), self.overflow == 'block')
+		except queue.Full:
+			if self.overflow == 'inline':
+				self.inlined += 1
+				function(*args, **kwargs)
+				return True
+			if not self.dropped % 1000:
+				logging.warning('Background queue is full, %s calls dropped', self.dropped + 1)
+			self.dropped += 1
+			return False
+		return True
+
+	def __len__(self) -> int:
+		return _.unfinished_tasks if (_ := self.queue) is not None else 0
+
+	def flush(self, timeout:float = 5.0) -> bool:
+		""" Wait for the queued calls to finish, at shutdown, True if the
+			queue has been drained in time.
+		"""
+		if self.pid == os.getpid():
+			deadline = time.monotonic() + timeout
+			while len(self) and time.monotonic() < deadline:
+				backend.sleep(0.01)
+		return not len(self)
+
+#: Shared by the whole process.
+workers = Workers()
+
+atexit.register(workers.flush)
+
+if hasattr(os, 'register_at_fork'):
+	#: A parent thread may have held the lock at the fork.
+	os.register_at_fork(after_in_child=lambda: setattr(workers, 'lock', threading.Lock()))
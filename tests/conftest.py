@@ -0,0 +1,17 @@
+import logging
+
+import pytest
+
+from .server import Server
+
+logging.getLogger('sentinel.tcp.client').setLevel(logging.CRITICAL)
+
+@pytest.fixture
+def server():
+	with Server(pipeline=True) as _:
+		yield _
+
+@pytest.fixture
+def plain():
+	with Server(pipeline=False) as _:
+		yield _
@@ -0,0 +1,163 @@
+import sys
+import json
+import time
+import zlib
+import socket
+import threading
+
+from collections import Counter
+
+class Server(object):
+	""" Stand-in relock service speaking the framing of the client: a 3-byte
+		length header, the JSON hello, and with pipelining a 4-byte request
+		id in front of every body. Pipelined requests are answered by their
+		own threads, so a slow request doesn't hold the faster ones behind
+		it and the replies go back out of order.
+
+			sleep    - replies after `t` seconds
+			batch    - the answers of its calls
+			members  - no other members, unless set in `answers`
+			the other routes in `answers` get their answer, anything else
+			is echoed back
+	"""
+
+	def __init__(self, pipeline:bool = True, host:str = '127.0.0.1', port:int = 0, path:str = None,
+					   compress:int = 0):
+		self.pipeline = pipeline
+		#: Frames above this size are sent compressed to the clients which
+		#: ask for zlib, zero turns the compression off.
+		self.compress = compress
+		self.zlib     = set()
+		#: Compressed frames 'received' and 'sent'.
+		self.compressed = Counter()
+		if path is not None:
+			#: Co-located server on a unix domain socket.
+			self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			self.listener.bind(path)
+			self.listener.listen()
+			self.host, self.port = 'unix://' + path, 0
+		else:
+			self.listener = socket.create_server((host, port))
+			self.host, self.port = self.listener.getsockname()[:2]
+		#: Replies of the routes which aren't echoed, e.g. the cluster 
+		#: reported by the members route.
+		self.answers  = {'members': {}}
+		#: Seconds every reply is held back, a slow server.
+		self.delay    = 0.0
+		#: Routes whose requests are read and the connection closed without
+		#: a reply, as if the server had crashed.
+		self.hangup   = set()
+		#: Keys of the requests in the order of their replies.
+		self.replies  = list()
+		self.routes   = Counter()
+		self.lock     = threading.Lock()
+		self.closed   = False
+
+	def __enter__(self):
+		threading.Thread(target=self.serve, daemon=True).start()
+		return self
+
+	def __exit__(self, *args):
+		self.closed = True
+		self.listener.close()
+
+	def serve(self):
+		while not self.closed:
+			try:
+				conn, _ = self.listener.accept()
+			except OSError:
+				return
+			threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+	def recv(self, conn:socket.socket, size:int) -> bytes:
+		_ = bytearray()
+		while len(_) < size:
+			if not (chunk := conn.recv(size - len(_))):
+				raise EOFError()
+			_ += chunk
+		return bytes(_)
+
+	def frame(self, conn:socket.socket) -> bytes:
+		#: With zlib the top bit of the header flags a compressed frame.
+		mask = 0x7FFFFF if conn in self.zlib else 0xFFFFFF
+		flag = (size := int.from_bytes(self.recv(conn, 3), 'big')) & ~mask
+		if (size := size & mask) == mask:
+			size = int.from_bytes(self.recv(conn, 8), 'big')
+		if flag:
+			self.compressed['received'] += 1
+			return zlib.decompress(self.recv(conn, size))
+		return self.recv(conn, size)
+
+	def send(self, conn:socket.socket, body:bytes):
+		mask, flag = 0x7FFFFF if conn in self.zlib else 0xFFFFFF, 0
+		if conn in self.zlib and len(body) > self.compress:
+			if len(packed := zlib.compress(body)) < len(body):
+				body, flag = packed, 0x800000
+				self.compressed['sent'] += 1
+		if len(body) >= mask:
+			header = (mask | flag).to_bytes(3, 'big') + len(body).to_bytes(8, 'big')
+		else:
+			header = (len(body) | flag).to_bytes(3, 'big')
+		conn.sendall(header + body)
+
+	def handle(self, conn:socket.socket):
+		writing, pipelined = threading.Lock(), False
+		try:
+			hello = json.loads(self.frame(conn))
+			pipelined = bool(self.pipeline and hello.get('pipeline'))
+			compression = 'zlib' if self.compress and 'zlib' in (hello.get('compression') or ()) else None
+			self.send(conn, json.dumps({'codec': 'json',
+										'compression': compression,
+										'stream': False,
+										'pipeline': pipelined}).encode())
+			if compression:
+				self.zlib.add(conn)
+			while not self.closed:
+				body, rid = self.frame(conn), bytes()
+				if pipelined:
+					rid, body = body[:4], body[4:]
+					threading.Thread(target=self.reply, args=(conn, writing, rid, body),
+									 daemon=True).start()
+				else:
+					self.reply(conn, writing, rid, body)
+		except (EOFError, OSError, ValueError, zlib.error):
+			self.zlib.discard(conn)
+			conn.close()
+
+	def answer(self, request:dict) -> object:
+		with self.lock:
+			self.routes[route := request.get('route')] += 1
+		if self.delay:
+			time.sleep(self.delay)
+		if route == 'sleep':
+			time.sleep(request.get('t', 0.1))
+		if route == 'batch':
+			return [self.answer(call) for call in request.get('batch', ())]
+		return self.answers.get(route, request)
+
+	def reply(self, conn:socket.socket, writing:threading.Lock, rid:bytes, body:bytes):
+		if body == b'PING':
+			out, key = b'PONG', None
+		else:
+			request = json.loads(body)
+			if request.get('route') in self.hangup:
+				with self.lock:
+					self.routes[request.get('route')] += 1
+				conn.shutdown(socket.SHUT_RDWR)
+				return
+			out, key = json.dumps(self.answer(request)).encode(), request.get('key')
+		with writing:
+			try:
+				self.send(conn, rid + out)
+			except OSError:
+				return
+			with self.lock:
+				self.replies.append(key)
+
+if __name__ == '__main__':
+	#: python tests/server.py [port] [plain], serves until killed.
+	with Server(pipeline='plain' not in sys.argv,
+				port=int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 0) as server:
+		print(server.port, flush=True)
+		while True:
+			time.sleep(3600)
@@ -0,0 +1,21 @@
+import asyncio
+
+from relock.aio import AsyncTCP, AsyncDevice
+
+def test_before_carries_the_session(server):
+	async def before():
+		async with AsyncTCP(server.host, server.port, health=0) as tcp:
+			return await AsyncDevice(tcp, sid='xsid', rid='rqid', host='example.com').before(path='/')
+	response = asyncio.run(before())
+	assert response['route'] == 'before' and response['path'] == '/'
+	assert (response['sid'], response['rid'], response['host']) == ('xsid', 'rqid', 'example.com')
+
+def test_timeout_is_told_from_an_empty_reply(server):
+	server.answers['close'] = None
+	async def calls():
+		async with AsyncTCP(server.host, server.port, health=0, deadline=0.2) as tcp:
+			return await tcp('close'), await tcp('sleep', t=1), await tcp.get('key')
+	empty, late, value = asyncio.run(calls())
+	assert empty.ok and empty.response is None
+	assert late.status == 'timeout' and late.response is None
+	assert value == {'route': 'get', 'key': 'key'}
@@ -0,0 +1,41 @@
+from relock import TCP
+from relock.tcp.channel import Channel
+
+def test_events_of_a_key_are_merged():
+	channel = Channel(None, size=10)
+	channel.emit('user_accessed', key='a', n=1)
+	channel.emit('user_accessed', key='b', n=2)
+	channel.emit('user_accessed', key='a', n=3)
+	assert channel.take() == [{'route': 'user_accessed', 'n': 2}, {'route': 'user_accessed', 'n': 3}]
+	assert (channel.emitted, channel.merged) == (3, 1)
+
+def test_events_without_a_key_are_never_merged():
+	channel = Channel(None, size=10)
+	for key in (None, str(), None):
+		channel.emit('open', key=key)
+	assert len(channel) == 3 and not channel.merged
+
+def test_full_buffer_drops_the_new_events():
+	channel = Channel(None, size=2, capacity=2)
+	assert channel.emit('open') and channel.emit('open')
+	assert not channel.emit('open')
+	assert channel.dropped == 1 and len(channel) == 2
+
+def test_empty_replies_are_delivered(server):
+	server.answers.update({'close': None, 'unlink': None})
+	channel = Channel(TCP(server.host, server.port, health=0, linger=0), size=10)
+	for route in ('close', 'unlink', 'open'):
+		channel.emit(route)
+	channel.flush()
+	assert channel.stats == {'emitted': 3, 'merged': 0, 'dropped': 0, 'flushed': 3,
+							 'failed': 0, 'frames': 1, 'buffered': 0}
+	assert server.routes['batch'] == 1 and server.routes['close'] == 1
+
+def test_undelivered_events_have_failed(server):
+	channel = Channel(TCP(server.host, server.port, health=0, linger=0, deadline=0.2), size=2)
+	for t in range(3):
+		channel.emit('sleep', t=1)
+	channel.flush()
+	assert (channel.flushed, channel.failed, channel.frames) == (0, 3, 0)
+	#: The timed out batches are never replayed.
+	assert server.routes['batch'] == 2
@@ -0,0 +1,51 @@
+from relock import TCP
+from relock.tcp.cluster import Ring, candidates
+
+from .server import Server
+
+def test_colocated_server_is_kept_on_its_unix_socket():
+	members = [{'addr': '127.0.0.1', 'port': 8111}, {'addr': '10.0.0.2', 'port': 8111}]
+	assert list(candidates(members, [('unix:///run/relock.sock', 0)])) == [('10.0.0.2', 8111),
+																		   ('unix:///run/relock.sock', 0)]
+	assert list(candidates(members, [('127.0.0.1', 8111)])) == [('127.0.0.1', 8111), ('10.0.0.2', 8111)]
+
+def test_more_local_servers_than_unix_sockets_are_all_kept():
+	members = [{'addr': '127.0.0.1', 'port': 8111}, {'addr': '127.0.0.1', 'port': 8112}]
+	assert len(candidates(members, [('unix:///run/relock.sock', 0)])) == 3
+
+def test_discovery_doesnt_add_the_unix_server_twice(tmp_path):
+	with Server(pipeline=False) as network, \
+		 Server(pipeline=False, path=str(tmp_path / 'relock.sock')) as unix:
+		network.answers['members'] = unix.answers['members'] = {'a': {'addr': network.host,
+																	  'port': network.port}}
+		tcp = TCP([(unix.host, unix.port)], pool=1, health=0, linger=0)
+		round(tcp)
+		assert [(_.host, _.port) for _ in tcp.servers] == [(unix.host, 0)]
+		assert tcp('echo', key='unix').ok and not network.routes
+
+def test_new_node_takes_about_1_of_n_keys():
+	ring, keys = Ring(), ['session-%s' % _ for _ in range(10000)]
+	for port in range(8111, 8115):
+		ring.add(('10.0.0.1', port))
+	before = {key: ring.lookup(key) for key in keys}
+	ring.add(('10.0.0.1', 8115))
+	moved = [key for key in keys if ring.lookup(key) != before[key]]
+	assert 0.1 < len(moved) / len(keys) < 0.3
+	assert {ring.lookup(key) for key in moved} == {('10.0.0.1', 8115)}
+	ring.discard(('10.0.0.1', 8115))
+	assert {key: ring.lookup(key) for key in keys} == before
+
+def test_calls_of_a_session_stick_to_one_server():
+	with Server(pipeline=False) as a, Server(pipeline=False) as b:
+		tcp = TCP([(a.host, a.port), (b.host, b.port)], affinity=True, health=0, linger=0)
+		for sid in ('first', 'second', 'third'):
+			a.routes.clear()
+			b.routes.clear()
+			for _ in range(5):
+				assert tcp('echo', sid=sid).ok
+			assert sorted((a.routes['echo'], b.routes['echo'])) == [0, 5]
+		a.routes.clear()
+		b.routes.clear()
+		for _ in range(4):
+			assert tcp('echo').ok
+		assert a.routes['echo'] == b.routes['echo'] == 2
@@ -0,0 +1,42 @@
+import flask
+import flask_login
+
+from relock.flask import Flask
+
+class User(flask_login.UserMixin):
+
+	def __init__(self, id:str):
+		self.id, self.email = id, '%s@example.com' % id
+
+def application(server, **kwargs) -> flask.Flask:
+	app = flask.Flask(__name__)
+	app.secret_key = 'secret'
+	flask_login.LoginManager(app).user_loader(User)
+	@app.route('/login')
+	def login():
+		flask_login.login_user(User('1'))
+		return 'in' if '_user_id' in flask.session else 'out'
+	Flask(host=server.host, port=server.port, health=0, linger=0, **kwargs).init_app(app)
+	return app
+
+def test_arguments_survive_init_app(server):
+	relock = Flask(host=server.host, port=server.port, pool=3, pipeline=True, health=0,
+				   hedge='validate', deadline=1.5, linger=0)
+	relock.init_app(flask.Flask(__name__))
+	assert (relock.host, relock.port, relock.pool) == (server.host, server.port, 3)
+	assert relock.pipeline and relock.hedge == 'validate' and relock.deadline == 1.5
+	assert relock.tcp.pool == 3 and relock.tcp.pipeline and relock.tcp.deadline == 1.5
+	assert 'validate' in relock.tcp.hedge
+
+def test_environment_fills_the_defaults(server, monkeypatch):
+	monkeypatch.setenv('RELOCK_SERVICE_PORT', str(server.port))
+	monkeypatch.setenv('RELOCK_SERVICE_DEADLINE', '2.5')
+	relock = Flask(flask.Flask(__name__), host=server.host, health=0, linger=0)
+	assert relock.tcp is not None and relock.tcp.deadline == 2.5
+
+def test_login_of_a_revoked_session_is_refused(server):
+	client = application(server).test_client()
+	assert client.get('/login').text == 'in'
+	server.answers['user_logged_in'] = 407
+	assert client.get('/login').text == 'out'
+	assert server.routes['user_logged_in'] == 2
@@ -0,0 +1,29 @@
+import os
+import time
+import signal
+
+from relock import TCP
+
+def test_child_doesnt_inherit_a_held_lock(server):
+	tcp = TCP(server.host, server.port, health=0, linger=0, hedge='validate')
+	locks = (tcp.budget.lock, tcp.hedge.lock, tcp.hedge.budget.lock)
+	for lock in locks:
+		lock.acquire()
+	try:
+		if not (pid := os.fork()):
+			#: The first call of the child rebuilds the client.
+			ok = tcp('echo', key='child').ok and tcp.hedge.budget.withdraw()
+			tcp.hedge.record('validate', 0.01)
+			os._exit(0 if ok else 1)
+		for _ in range(100):
+			if (status := os.waitpid(pid, os.WNOHANG))[0]:
+				break
+			time.sleep(0.05)
+		else:
+			os.kill(pid, signal.SIGKILL)
+			os.waitpid(pid, 0)
+			raise AssertionError('The forked child has deadlocked.')
+		assert os.WEXITSTATUS(status[1]) == 0
+	finally:
+		for lock in locks:
+			lock.release()
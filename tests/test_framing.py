@@ -0,0 +1,59 @@
+import os
+import base64
+
+import pytest
+
+from relock import TCP
+from relock.tcp.pool import Exhausted
+
+from .server import Server
+
+def test_frames_over_16_mib_round_trip(server):
+	tcp = TCP(server.host, server.port, health=0, linger=0, deadline=30)
+	value = 'x' * (17 << 20)
+	with tcp('echo', value=value) as result:
+		assert result.ok and result.response['value'] == value
+
+def test_stream_yields_the_items(server):
+	tcp = TCP(server.host, server.port, health=0, linger=0)
+	assert dict(tcp.stream('echo', key='stream')) == {'route': 'echo', 'key': 'stream'}
+
+def test_stream_without_a_server_raises(server):
+	tcp = TCP(server.host, server.port, health=0, linger=0)
+	tcp.servers = tcp.servers.fork()
+	with pytest.raises(ConnectionRefusedError):
+		list(tcp.stream('echo'))
+
+def test_stream_of_a_busy_pool_raises(server):
+	tcp = TCP(server.host, server.port, pool=1, acquire=0.1, health=0, linger=0)
+	next(held := tcp.stream('echo', key='held'))
+	with pytest.raises(Exhausted):
+		list(tcp.stream('echo'))
+	held.close()
+	assert list(tcp.stream('echo'))
+
+@pytest.fixture
+def compressing():
+	with Server(pipeline=False, compress=1024) as _:
+		yield _
+
+def test_large_frames_are_compressed(compressing):
+	tcp = TCP(compressing.host, compressing.port, compress=1024, health=0, linger=0)
+	with tcp('echo', key='small') as result:
+		assert result.ok and not compressing.compressed
+	with tcp('echo', value='x' * 100000) as result:
+		assert result.ok and result.response['value'] == 'x' * 100000
+	assert compressing.compressed == {'received': 1, 'sent': 1}
+
+def test_compression_is_negotiated(compressing):
+	tcp = TCP(compressing.host, compressing.port, compress=0, health=0, linger=0)
+	with tcp('echo', value='x' * 100000) as result:
+		assert result.ok and result.response['value'] == 'x' * 100000
+	assert not compressing.compressed
+
+def test_compressed_frames_over_8_mib_round_trip(compressing):
+	tcp = TCP(compressing.host, compressing.port, compress=1024, health=0, linger=0, deadline=30)
+	value = base64.b64encode(os.urandom(12 << 20)).decode()
+	with tcp('echo', value=value) as result:
+		assert result.ok and result.response['value'] == value
+	assert compressing.compressed == {'received': 1, 'sent': 1}
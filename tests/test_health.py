@@ -0,0 +1,36 @@
+import time
+import socket
+
+from relock import TCP
+from relock.tcp.cluster import Server
+
+def test_server_is_ejected_probed_and_let_back_in(server):
+	tcp = TCP(server.host, server.port, pool=1, health=0, linger=0)
+	node = tcp.servers[0]
+	node.cooldown = 0.05
+	for _ in range(node.threshold):
+		assert node.routable
+		node.failure()
+	assert node.state == 'ejected' and not node.routable
+	#: Not probed before the cooldown.
+	assert not tcp.check(node) and node.state == 'ejected'
+	time.sleep(0.06)
+	assert tcp.check(node) and node.state == 'half-open' and node.routable
+	#: The failed trial call ejects it right away.
+	node.failure()
+	assert node.state == 'ejected'
+	time.sleep(0.06)
+	assert tcp.check(node)
+	assert tcp('echo', key='trial').ok and node.state == 'healthy' and not node.failures
+
+def test_server_which_is_down_stays_ejected(server):
+	with socket.socket() as sock:
+		sock.bind(('127.0.0.1', 0))
+		port = sock.getsockname()[1]
+	tcp, node = TCP(server.host, server.port, health=0, linger=0), Server('127.0.0.1', port)
+	node.cooldown = 0
+	node.eject()
+	assert not tcp.check(node) and node.state == 'ejected'
+
+def test_every_server_has_its_own_lock():
+	assert Server('a', 1).__breaker__ is not Server('b', 1).__breaker__
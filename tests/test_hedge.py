@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from relock import TCP
+from relock.tcp.hedge import Hedge
+
+from .server import Server
+
+@pytest.fixture
+def cluster():
+	with Server(pipeline=False) as a, Server(pipeline=False) as b:
+		yield a, b
+
+def client(servers, threshold:float) -> TCP:
+	tcp = TCP([(_.host, _.port) for _ in servers], health=0, linger=0, hedge='echo')
+	for _ in range(Hedge.samples):
+		tcp.hedge.record('echo', threshold)
+	return tcp
+
+def test_threshold_is_the_percentile_of_the_round_trips():
+	hedge = Hedge('validate, before', percentile=95)
+	for ms in range(1, Hedge.samples):
+		hedge.record('validate', ms / 1000)
+	assert hedge.threshold('validate') is None
+	for ms in range(Hedge.samples, 101):
+		hedge.record('validate', ms / 1000)
+	assert hedge.threshold('validate') == 0.096
+	assert 'before' in hedge and 'exchange' not in Hedge('exchange, validate')
+
+def test_late_reply_is_hedged_to_another_server(cluster):
+	cluster[0].delay = 0.5
+	tcp = client(cluster, 0.05)
+	for _ in cluster:
+		started = time.monotonic()
+		with tcp('echo', key='hedged') as result:
+			assert result.ok and result.server == (cluster[1].host, cluster[1].port)
+		assert time.monotonic() - started < 0.3
+	#: The fast server took both calls, the slow one only the first leg.
+	assert (cluster[0].routes['echo'], cluster[1].routes['echo']) == (1, 2)
+
+def test_reply_within_the_threshold_isnt_hedged(cluster):
+	cluster[0].delay = 0.1
+	tcp = client(cluster, 1.0)
+	for _ in range(4):
+		assert tcp('echo').ok
+	assert cluster[0].routes['echo'] == cluster[1].routes['echo'] == 2
+
+def test_hedges_are_capped_by_the_budget(cluster):
+	for _ in cluster:
+		_.delay = 0.1
+	tcp = client(cluster, 0.02)
+	tcp.hedge.budget.tokens = 0.0
+	for _ in range(4):
+		assert tcp('echo').ok
+	assert cluster[0].routes['echo'] + cluster[1].routes['echo'] == 4
+	tcp.hedge.budget.tokens = 1.0
+	for _ in range(2):
+		assert tcp('echo').ok
+	assert cluster[0].routes['echo'] + cluster[1].routes['echo'] == 7
@@ -0,0 +1,40 @@
+import random
+import threading
+
+from relock import TCP
+from relock.tcp.pipeline import Pipeline, Multiplex
+
+def test_replies_out_of_order(server):
+	conn = Pipeline(server.host, server.port)
+	try:
+		slow = conn.submit(route='sleep', t=0.5, key='slow')
+		fast = conn.submit(route='echo', key='fast')
+		assert fast.result(timeout=2)['key'] == 'fast'
+		assert not slow.done()
+		assert slow.result(timeout=2)['key'] == 'slow'
+		assert server.replies == ['fast', 'slow']
+		assert not conn.pending
+	finally:
+		conn.close()
+
+def test_many_requests_share_one_connection(server):
+	tcp = TCP(server.host, server.port, pool=1, pipeline=True, health=0)
+	results, keys = dict(), list(range(40))
+	def call(key):
+		with tcp('sleep', t=random.uniform(0, 0.05), key=key) as result:
+			results[key] = result.response['key'] if result.ok else None
+	threads = [threading.Thread(target=call, args=(key,)) for key in keys]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	assert results == {key: key for key in keys}
+	assert isinstance(pool := tcp.servers[0].pool, Multiplex) and pool.pipelined
+	assert len(pool) == 1
+
+def test_unconfirmed_pipelining_falls_back_to_plain_connections(plain):
+	tcp = TCP(plain.host, plain.port, pool=2, pipeline=True, health=0)
+	with tcp('echo', key='plain') as result:
+		assert result.ok and result.response['key'] == 'plain'
+	assert not tcp.servers[0].pool.pipelined
+	assert not any(isinstance(conn, Pipeline) for conn in tcp.servers[0].pool)
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from relock import TCP
+from relock.tcp.retry import Budget
+
+from .server import Server
+
+@pytest.fixture
+def cluster():
+	with Server(pipeline=False) as a, Server(pipeline=False) as b:
+		yield a, b
+
+def client(servers, **kwargs) -> TCP:
+	tcp = TCP([(_.host, _.port) for _ in servers], health=0, linger=0, **kwargs)
+	assert len(tcp.servers) == len(servers)
+	return tcp
+
+def sent(servers, route:str) -> int:
+	return sum(_.routes[route] for _ in servers)
+
+def test_idempotent_route_is_replayed(cluster):
+	for _ in cluster:
+		_.hangup.add('get')
+	with client(cluster)('get', key='key') as result:
+		assert result.status == 'down'
+	assert sent(cluster, 'get') == len(cluster) + 1
+
+@pytest.mark.parametrize('route', ['exchange', 'batch'])
+def test_route_which_may_have_run_is_never_replayed(cluster, route):
+	for _ in cluster:
+		_.hangup.add(route)
+	tcp = client(cluster, idempotent={'get', route})
+	with tcp(route, batch=[]) as result:
+		assert not result.ok
+	assert sent(cluster, route) == 1
+
+def test_replay_goes_to_the_next_server(cluster):
+	cluster[0].hangup.add('get')
+	tcp = client(cluster)
+	for _ in range(4):
+		with tcp('get', key='key') as result:
+			assert result.ok and result.response['key'] == 'key'
+	assert cluster[0].routes['get'] and cluster[1].routes['get'] == 4
+
+def test_retries_stop_when_the_budget_is_spent(cluster):
+	for _ in cluster:
+		_.hangup.add('get')
+	tcp = client(cluster, budget=0.0)
+	tcp.budget.tokens = 1.0
+	with tcp('get', key='key') as result:
+		assert not result.ok
+	assert sent(cluster, 'get') == 2
+
+def test_budget_is_capped_by_the_reserve():
+	budget = Budget(0.5, reserve=2.0)
+	for _ in range(10):
+		budget.deposit()
+	assert budget.withdraw() and budget.withdraw() and not budget.withdraw()
+	budget.deposit()
+	assert not budget.withdraw()
+	budget.deposit()
+	assert budget.withdraw() and not budget.withdraw()
+
+def test_call_is_cut_off_at_the_deadline(server):
+	tcp = TCP(server.host, server.port, health=0, linger=0, deadline=5, deadlines={'sleep': 0.2})
+	started = time.monotonic()
+	with tcp('sleep', t=2) as result:
+		assert result.status == 'timeout' and result.response is None
+	assert time.monotonic() - started < 1
+	with tcp('echo', key='next') as result:
+		assert result.ok and result.response['key'] == 'next'